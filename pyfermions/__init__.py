@@ -1,7 +1,64 @@
 __version__ = "1.5dev0"
 
+import importlib
+
 from .utils import *
 from .signal import *
 from .wavelets import *
-from .hilbert import *
-from .mera import *
+from .lattice import *
+from .storage import *
+from .entropies import *
+from .utils import __all__ as _utils_all
+from .signal import __all__ as _signal_all
+from .wavelets import __all__ as _wavelets_all
+from .lattice import __all__ as _lattice_all
+from .storage import __all__ as _storage_all
+from .entropies import __all__ as _entropies_all
+
+# public names defined in submodules that pull in heavy SciPy machinery; these submodules are only imported on first
+# attribute access (PEP 562), so that e.g. worker processes that only need signal arithmetic start up quickly
+_LAZY = {
+    "allpass": "hilbert",
+    "leja": "hilbert",
+    "sfact": "hilbert",
+    "selesnick_hwlet": "hilbert",
+    "evenbly_white_hwlet": "hilbert",
+    "hwlet_metrics": "hilbert",
+    "phase_error_gradient": "hilbert",
+    "common_factor_biorth_wlet": "hilbert",
+    "massless_harmonic_biorth_wlet": "hilbert",
+    "rational_phase_approximation": "hilbert",
+    "variational_harmonic_biorth_wlet": "hilbert",
+    "mera1d": "mera",
+    "periodic_mera1d": "mera",
+    "mera2d": "mera",
+    "mera3d": "mera",
+    "bosonic_mera": "mera",
+    "optimize_hwlet": "optimize",
+}
+
+__all__ = (
+    _utils_all
+    + _signal_all
+    + _wavelets_all
+    + _lattice_all
+    + _storage_all
+    + _entropies_all
+    + list(_LAZY)
+)
+
+
+def __getattr__(name):
+    # importing a submodule binds it as an attribute of the package
+    if name in _LAZY.values():
+        return importlib.import_module("." + name, __name__)
+    if name in _LAZY:
+        module = importlib.import_module("." + _LAZY[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_LAZY.values()))
@@ -0,0 +1,209 @@
+import functools, math
+import numpy as np
+from .utils import *
+from .utils import _chunk_size
+
+__all__ = ["entropy", "entropy_estimate", "trace_estimate"]
+
+
+def entropy(C, alpha=1):
+    """
+    Return von Neumann (alpha=1) or Renyi entropy of the Gaussian state with covariance matrix C, computed from the
+    eigenvalues of C (which takes O(R^3) operations, see entropy_estimate for large subsystems).
+    """
+    return np.sum(_entropy_function(alpha)(np.linalg.eigvalsh(C)))
+
+
+def entropy_estimate(
+    mera,
+    region,
+    levels=None,
+    alpha=1,
+    tol=1e-3,
+    dense=False,
+    seed=None,
+    executor=None,
+    n_jobs=None,
+    max_levels=30,
+    **kwargs,
+):
+    """
+    Estimate the von Neumann (alpha=1) or Renyi entropy of the given region in the MERA state without diagonalizing the
+    covariance matrix. Returns the estimate and its error bar (one standard error).
+
+    The region can be a number of sites R (for the sites 0, ..., R-1), a pair (start, stop), or a sequence of sites.
+    The entropy Tr h(C) is estimated by trace_estimate (to which further keyword arguments are passed), which only needs
+    matrix-vector products with the covariance matrix C. For a mera1d and a contiguous region, these are computed by
+    mera1d.covariance_operator in O(R log R) per product, so that no R x R matrix is formed. Otherwise, or if dense is
+    True, the covariance matrix is computed first. If levels is None for a mera1d, the number of levels is chosen as in
+    mera1d.covariance_adaptive, i.e. such that the entries of C are accurate to tol (at most max_levels).
+
+    Since h vanishes at the occupation numbers 0 and 1, h(C) is dominated by the few eigenvalues of C away from 0 and 1,
+    so that the deflation in trace_estimate leaves only a small remainder to be estimated stochastically.
+    """
+    if isinstance(region, (int, np.integer)):
+        region = (0, region)
+    if isinstance(region, tuple):
+        region = np.arange(*region)
+    x = np.asarray(region)
+    contiguous = x.size > 0 and np.all(np.diff(x) == 1)
+
+    if levels is None and hasattr(mera, "iter_two_point"):
+        # the error bounds of all entries follow from the diagonal, so the R x R matrix is not needed to choose levels
+        for levels, _, error in mera.iter_two_point(x, x, max_levels):
+            if np.max(error) < tol:
+                break
+
+    if contiguous and not dense and hasattr(mera, "covariance_operator"):
+        C = mera.covariance_operator(x[0], x[-1] + 1, levels)
+    else:
+        C = mera.covariance(levels=levels, sites=x)
+    return trace_estimate(
+        C,
+        _entropy_function(alpha),
+        tol,
+        seed=seed,
+        executor=executor,
+        n_jobs=n_jobs,
+        sketch=_entanglement_sketch,
+        **kwargs,
+    )
+
+
+def trace_estimate(
+    A,
+    f,
+    tol=1e-3,
+    steps=30,
+    rank=40,
+    power_iterations=2,
+    batch_size=8,
+    max_probes=1024,
+    seed=None,
+    executor=None,
+    n_jobs=None,
+    sketch=None,
+):
+    """
+    Estimate Tr f(A) for a Hermitian matrix A by stochastic Lanczos quadrature with deflation (as in Hutch++), and return
+    the estimate and its error bar (one standard error of the stochastic part).
+
+    A can be any object that supports A @ V for (R x p) arrays V, such as an array or a scipy LinearOperator, and f
+    should be a vectorized function. Quadratic forms z^* f(A) z are approximated by Gauss quadrature with nodes and
+    weights obtained from steps Lanczos iterations started at z.
+
+    First, an orthonormal basis Q of rank vectors that approximately spans the dominant part of f(A) is computed by
+    power_iterations steps of subspace iteration with sketch(A, V) (by default, A @ V). Then Tr Q^* f(A) Q is computed
+    by quadrature, and the trace of the remainder (1 - Q Q^*) f(A) (1 - Q Q^*) is estimated by the mean of quadratic
+    forms with projected random sign vectors. The estimate is unbiased (up to quadrature errors).
+
+    The probes are processed in batches of batch_size (reduced if necessary to fit into the memory budget, see
+    utils.memory_budget), and the batches are evaluated in parallel (see utils.parallel_map; process pools require A to
+    be picklable). Batches are added until the error bar is below tol or max_probes probes have been used. Each batch
+    has its own random seed derived from seed, so the result does not depend on the parallelization.
+    """
+    R = A.shape[0]
+    itemsize = np.result_type(A.dtype, float).itemsize
+    batch_size = _chunk_size(
+        batch_size, (steps + 4) * R * itemsize, 0, "trace_estimate"
+    )
+    if sketch is None:
+        sketch = _matmul
+    seeds = np.random.SeedSequence(seed)
+
+    # deflation
+    rng = np.random.default_rng(seeds.spawn(1)[0])
+    Q = np.linalg.qr(rng.standard_normal((R, min(rank, R))))[0]
+    for _ in range(power_iterations):
+        Q = np.linalg.qr(sketch(A, Q))[0]
+    quadrature = functools.partial(_quadrature, A, f, steps)
+    batches = [Q[:, i : i + batch_size] for i in range(0, Q.shape[1], batch_size)]
+    exact = np.sum(np.concatenate(parallel_map(quadrature, batches, executor, n_jobs)))
+    if Q.shape[1] == R:
+        return exact, 0.0
+
+    # stochastic estimate of the remainder, starting with two batches and adding as many as the variance suggests
+    f_batch = functools.partial(_projected_samples, quadrature, Q, batch_size)
+    samples, num_batches = np.zeros(0), 2
+    while True:
+        batches = parallel_map(f_batch, seeds.spawn(num_batches), executor, n_jobs)
+        samples = np.concatenate([samples, *batches])[:max_probes]
+        std = np.std(samples, ddof=1)
+        error = std / math.sqrt(len(samples))
+        if error <= tol or len(samples) == max_probes:
+            return exact + np.mean(samples), error
+        needed = min((std / tol) ** 2, max_probes) - len(samples)
+        num_batches = max(math.ceil(needed / batch_size), 1)
+
+
+def _matmul(A, V):
+    return np.reshape(A @ V, V.shape)
+
+
+def _entanglement_sketch(C, V):
+    """Apply C (1 - C), whose dominant eigenvectors are those of the occupation numbers closest to 1/2."""
+    CV = _matmul(C, V)
+    return CV - _matmul(C, CV)
+
+
+def _projected_samples(quadrature, Q, num_probes, seed):
+    """Return quadrature approximations of z^* f(A) z for num_probes random sign vectors projected onto Q^perp."""
+    rng = np.random.default_rng(seed)
+    Z = rng.choice([-1.0, 1.0], (Q.shape[0], num_probes))
+    return quadrature(Z - Q @ (Q.conj().T @ Z))
+
+
+def _quadrature(A, f, steps, Z):
+    """Return Gauss quadrature approximations of z^* f(A) z for the columns z of Z."""
+    norms = np.linalg.norm(Z, axis=0)
+    nodes, weights = _lanczos_quadrature(A, Z / np.where(norms > 0, norms, 1), steps)
+    return norms**2 * np.sum(weights * f(nodes), axis=1)
+
+
+def _lanczos_quadrature(A, Z, steps):
+    """
+    Run Lanczos iterations with full reorthogonalization for each (normalized) column of Z simultaneously, and return
+    the nodes and weights of the Gauss quadrature rules for the spectral measures of A with respect to the columns.
+    """
+    R, p = Z.shape
+    k = min(steps, R)
+    Q = np.zeros((k, R, p), dtype=np.result_type(A.dtype, Z))
+    a, b = np.zeros((p, k)), np.zeros((p, k))
+    q = Z
+    for j in range(k):
+        Q[j] = q
+        w = _matmul(A, q)
+        a[:, j] = np.real(np.sum(q.conj() * w, axis=0))
+        for _ in range(2):
+            w = w - np.einsum(
+                "jrp,jp->rp", Q[: j + 1], np.einsum("jrp,rp->jp", Q[: j + 1].conj(), w)
+            )
+        b[:, j] = np.linalg.norm(w, axis=0)
+
+        # the Krylov space is exhausted if w vanishes, in which case the remaining nodes get zero weight
+        exhausted = b[:, j] <= 1e-10 * np.maximum(np.abs(a[:, j]), 1)
+        b[exhausted, j] = 0
+        q = np.where(exhausted, 0, w / np.where(exhausted, 1, b[:, j]))
+
+    T = np.zeros((p, k, k))
+    idx = np.arange(k)
+    T[:, idx, idx] = a
+    T[:, idx[:-1], idx[1:]] = T[:, idx[1:], idx[:-1]] = b[:, :-1]
+    nodes, U = np.linalg.eigh(T)
+    return nodes, np.abs(U[:, 0, :]) ** 2
+
+
+def _entropy_function(alpha):
+    """Return h such that sum_i h(n_i) is the (Renyi) entropy of a Gaussian state with occupation numbers n_i."""
+
+    def h(n):
+        n = np.clip(n, 0, 1)
+        if alpha == 1:
+            return -_xlogx(n) - _xlogx(1 - n)
+        return np.log(n**alpha + (1 - n) ** alpha) / (1 - alpha)
+
+    return h
+
+
+def _xlogx(x):
+    return x * np.log(np.where(x > 0, x, 1))
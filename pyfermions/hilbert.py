@@ -1,13 +1,25 @@
+import functools, math
 import numpy as np
-import scipy.signal, scipy.linalg
 from .utils import *
 from .signal import *
 from .wavelets import *
 
-__all__ = ["allpass", "leja", "sfact", "selesnick_hwlet", "evenbly_white_hwlet"]
-
-
-def allpass(tau, L):
+__all__ = [
+    "allpass",
+    "leja",
+    "sfact",
+    "selesnick_hwlet",
+    "evenbly_white_hwlet",
+    "hwlet_metrics",
+    "phase_error_gradient",
+    "common_factor_biorth_wlet",
+    "massless_harmonic_biorth_wlet",
+    "rational_phase_approximation",
+    "variational_harmonic_biorth_wlet",
+]
+
+
+def allpass(tau, L, precision=None):
     """
     Return the filter d[n] such that
 
@@ -15,8 +27,11 @@ def allpass(tau, L):
 
     approximates A(z) = z^{-tau}.
 
-    The length of the filter d[n] is L+1.
+    The length of the filter d[n] is L+1. If precision is given, the filter is computed with that many decimal digits
+    using mpmath and rounded to double precision (see selesnick_hwlet).
     """
+    if precision is not None:
+        return np.array(_allpass_mp(tau, L, precision), dtype=float)
     n = np.arange(L)
     x = np.r_[1, (L - n) * (L - n - tau) / (n + 1) / (n + 1 + tau)]
     return np.cumprod(x)
@@ -34,29 +49,38 @@ def leja(a):
     n = len(a)
     c = np.argmax(np.abs(a))
     a[[c, 0]] = a[[0, c]]
+
+    # the products are updated by one factor per step, which takes O(n) memory (they vanish for j < k)
+    A = np.ones(n)
     for k in range(1, n):
-        A = np.abs(a[:, np.newaxis][:, [0] * k] - a[np.newaxis, :k][[0] * n, :])
-        A = np.prod(A, -1)
+        A *= np.abs(a - a[k - 1])
         c = np.argmax(A)
         a[[k, c]] = a[[c, k]]
+        A[[k, c]] = A[[c, k]]
     return a
 
 
-def sfact(h, min_phase=False, eps=1e-5):
+def sfact(h, min_phase=False, eps=1e-5, precision=None):
     """
     Return a mid-phase (or min-phase) spectral factorization of the polynomial h of degree 2n; i.e., a polynomial g of degree n such that
 
       h(X) = X^n g(X) g_conj(1/X)
 
     The min_phase parameter is ignored if h is a complex signal.
+    If precision is given, the roots are computed with that many decimal digits using mpmath (see selesnick_hwlet).
     This code is inspired by Selesnick's sfactM.m and sfact.m.
     """
+    import scipy.signal
+
     assert len(h) % 2 == 1, "Polynomial should have even degree."
     h = np.array(h)
     assert np.allclose(
         h, h[::-1].conj(), atol=0
     ), "Coefficient sequence should be Hermitian."
     isreal = np.all(np.isreal(h))
+    if precision is not None:
+        g = _sfact_mp(tuple(h.real if isreal else h), min_phase, eps, precision)
+        return np.array(g, dtype=float if isreal else complex)
 
     # find roots of original polynomials
     roots = np.roots(h)
@@ -110,7 +134,7 @@ def sfact(h, min_phase=False, eps=1e-5):
     return g
 
 
-def selesnick_hwlet(K, L, min_phase=False):
+def selesnick_hwlet(K, L, min_phase=False, precision=None):
     """
     Return Selesnick's Hilbert transform wavelet pair (h, g).
 
@@ -119,7 +143,19 @@ def selesnick_hwlet(K, L, min_phase=False):
 
     The length of both scaling filters is 2(K+L).
     This code is inspired by Selesnick's hwlet.m.
+
+    In double precision, the spectral factorization becomes inaccurate for K+L above about 20. If precision is given,
+    the filters are instead designed with that many decimal digits using mpmath (e.g., precision=50) and only the final
+    filters are rounded to double precision. Such designs are cached.
     """
+    if precision is not None:
+        h, g = _selesnick_hwlet_mp(K, L, min_phase, precision)
+        h = orthogonal_wavelet.from_scaling_filter(signal(h))
+        g = orthogonal_wavelet.from_scaling_filter(signal(g))
+        return h, g
+
+    import scipy.special
+
     d = allpass(1 / 2, L)
 
     # filter for z^(K+L) S(z)
@@ -162,3 +198,326 @@ def evenbly_white_hwlet():
     h = orthogonal_wavelet.from_scaling_filter(h_s)
     g = orthogonal_wavelet.from_scaling_filter(g_s)
     return h, g
+
+
+def common_factor_biorth_wlet(a, b, K, min_phase=False):
+    """
+    Return Selesnick-type common factor biorthogonal wavelet.
+
+    The parameter K determines the number of zeros at z=-1. The arrays a, b should have equal length and A(z)/B(z)
+    should implement the desired phase relation. The length of both scaling filters is 2(K+M), where M = len(a) - 1.
+    This code is inspired by Selesnick's hwlet.m.
+    """
+    import scipy.special
+
+    assert np.size(a) == np.size(b)
+    M = np.size(a) - 1
+
+    # filter for S(z) (up to a shift)
+    s1 = scipy.special.binom(2 * K, np.arange(2 * K + 1))
+    s = np.convolve(s1, np.convolve(a, b))
+
+    # solve convolution system for R(z) (up to a shift), rescaled to increase stability
+    A = convmtx(s, 2 * (K + M) - 1)
+    A = A[1::2]
+    x = np.zeros(2 * (K + M) - 1)
+    x[K + M - 1] = 1
+    A_norm = np.linalg.norm(A)
+    r = np.linalg.solve(A / A_norm, x) / A_norm
+    r = (r + r[::-1].conj()) / 2
+    assert np.allclose(A @ r, x)
+
+    # find spectral factor Q(z) and compute filters for z^K F(z) A(z) and z^K F(z) B(z)
+    q = sfact(r, min_phase=min_phase)
+    f = np.convolve(q, scipy.special.binom(K, np.arange(K + 1)))
+    g = np.convolve(f, b)
+    h = np.convolve(f, a)
+    return biorthogonal_wavelet.from_scaling_filters([signal(g), signal(h)])
+
+
+def massless_harmonic_biorth_wlet(K, L, min_phase=False):
+    """
+    Return biorthogonal wavelet for the massless harmonic chain, where the phase relation is implemented as a
+    combination of all-pass filters (see common_factor_biorth_wlet).
+
+    The parameter K determines the number of zeros at z=-1.
+    The parameter L determines the approximation of the phase relation.
+    The length of both scaling filters is 2(K+2L).
+    """
+    d = allpass(1 / 2, L)
+    a = (np.convolve(d, d) + np.convolve(d[::-1], d[::-1])) / 2
+    b = np.convolve(d, d[::-1])
+    return common_factor_biorth_wlet(a, b, K, min_phase=min_phase)
+
+
+def rational_phase_approximation(L, mass=0, eps=0.1, iterations=10):
+    """
+    Return symmetric arrays a, b of length 2L-1 such that A(e^{ik}) / B(e^{ik}) approximates the phase relation
+    sqrt(mass^2 + cos^2(k/2)) / sqrt(mass^2 + 1) for |k| < pi - eps, normalized so that A(1) = B(1) = 2.
+
+    The rational function is fitted by linearized least squares, iteratively reweighted by the previous denominator
+    (Sanathanan-Koerner iteration).
+    """
+    k = np.arange(-np.pi + eps, np.pi - eps, 0.01)
+    y = np.sqrt(mass**2 + np.cos(k / 2) ** 2) / np.sqrt(mass**2 + 1)
+
+    # A(k) = 2 + 2 sum_j a_j (cos(jk) - 1) and likewise for B, so A(k) = y B(k) is linear in (a_j, b_j)
+    c = np.cos(np.outer(k, np.arange(1, L))) - 1
+    design = np.c_[c, -y[:, np.newaxis] * c]
+    weights = np.ones_like(k)
+    for _ in range(iterations):
+        x = np.linalg.lstsq(
+            design * weights[:, np.newaxis], (y - 1) * weights, rcond=None
+        )[0]
+        weights = 1 / np.abs(1 + c @ x[L - 1 :])
+    a, b = x[: L - 1], x[L - 1 :]
+    a = np.r_[a[::-1], 2 * (1 - np.sum(a)), a]
+    b = np.r_[b[::-1], 2 * (1 - np.sum(b)), b]
+    return a, b
+
+
+def variational_harmonic_biorth_wlet(K, L, mass=0, min_phase=False, eps=0.1):
+    """
+    Return biorthogonal wavelet for the harmonic chain with given mass, where the phase relation is implemented by a
+    rational approximation (see rational_phase_approximation and common_factor_biorth_wlet).
+
+    The parameter K determines the number of zeros at z=-1.
+    The parameter L determines the approximation of the phase relation.
+    The length of both scaling filters is 2(K+2L-2).
+    """
+    a, b = rational_phase_approximation(L, mass=mass, eps=eps)
+    return common_factor_biorth_wlet(a, b, K, min_phase=min_phase)
+
+
+def hwlet_metrics(
+    pairs,
+    n=2,
+    S=20,
+    num_momenta=1024,
+    levels=15,
+    rtol=None,
+    executor=None,
+    n_jobs=None,
+):
+    """
+    Return dictionary with quality metrics of a Hilbert transform wavelet pair (h, g) or of a list of such pairs:
+
+    * eps: max_k |H_s(k) - e^{ik/2} G_s(k)|, sampled at the momenta k = -pi + 2 pi m / num_momenta
+    * B: bound on the scaling functions of h and g (see below)
+    * phase_error: maximal deviation of the phase of G_w(k) / H_w(k) from that of the ideal Hilbert pair,
+      -i sign(k) e^{ik/2}, at the momenta where |H_w(k)|^2 >= 1
+    * bound: a-priori bound on the error of n-point correlation functions with S layers (arXiv:1707.06243)
+
+    For a list of pairs, the values are arrays (so the result can be passed to pandas.DataFrame). All spectra are
+    computed by a single batched FFT. The scaling functions are approximated by the cascade algorithm with the given
+    number of levels, as in orthogonal_wavelet.scaling_function. If rtol is given, the cascade is stopped once the
+    maximum changes by less than rtol from one level to the next. This is faster, but the maximum still grows slowly
+    with the level, so B can be underestimated by more than rtol (e.g. by 1.6e-3 for selesnick_hwlet(2, 2) with
+    rtol=1e-4). The cascades can be evaluated in parallel (see utils.parallel_map).
+    """
+    single = isinstance(pairs[0], orthogonal_wavelet)
+    if single:
+        pairs = [pairs]
+    assert num_momenta % 2 == 0, "num_momenta should be even"
+
+    # spectra at the momenta k = -pi + 2 pi m / N (shifting by pi amounts to modulating by (-1)^n)
+    N = num_momenta
+    filters = [
+        f.modulate(-1.0)
+        for h, g in pairs
+        for f in (
+            h.scaling_filter,
+            g.scaling_filter,
+            h.wavelet_filter,
+            g.wavelet_filter,
+        )
+    ]
+    spectra = np.fft.fft(np.array([f.periodize(N) for f in filters]), axis=-1)
+    H_s, G_s, H_w, G_w = spectra.reshape(len(pairs), 4, N).transpose(1, 0, 2)
+    k = -np.pi + 2 * np.pi * np.arange(N) / N
+    eps = np.max(np.abs(H_s - np.exp(1j * k / 2) * G_s), axis=-1)
+
+    ideal = -1j * np.sign(k) * np.exp(1j * k / 2)
+    mask = (np.abs(H_w) ** 2 >= 1) & (k != 0)
+    phase = np.abs(np.angle(G_w * np.conj(ideal * H_w)))
+    phase_error = np.max(np.where(mask, phase, 0), axis=-1)
+
+    # bounds on scaling functions
+    wavelets = [w for pair in pairs for w in pair]
+    sup = functools.partial(_scaling_function_sup, levels=levels, rtol=rtol)
+    sups = parallel_map(sup, wavelets, executor, n_jobs)
+    B = np.max(np.reshape(sups, (len(pairs), 2)), axis=-1)
+
+    # a-priori error bound
+    M = np.array(
+        [max(len(h.scaling_filter.data), len(g.scaling_filter.data)) for h, g in pairs]
+    )
+    C = 2 ** (3 / 2) * np.sqrt(n) * B * M
+    bound = (
+        24 * np.sqrt(n) * np.sqrt(C * 2 ** (-S / 2) + 6 * eps * np.log2(C / eps) ** 2)
+    )
+
+    metrics = {"eps": eps, "B": B, "phase_error": phase_error, "bound": bound}
+    if single:
+        return {key: value[0] for key, value in metrics.items()}
+    return metrics
+
+
+def phase_error_gradient(h, g):
+    """
+    Return the L2 phase error
+
+      int_{-pi}^{pi} |H_s(k) - e^{ik/2} G_s(k)|^2 dk / 2 pi
+
+    of the real Hilbert transform wavelet pair (h, g), together with its gradients with respect to the scaling filters
+    (as signals on the same index ranges). This is a smooth surrogate for the error eps of hwlet_metrics.
+    """
+    a, b = h.scaling_filter, g.scaling_filter
+    assert np.isrealobj(a.data) and np.isrealobj(b.data), "Filters should be real."
+
+    # the cross term is sum_{n,m} a[n] b[m] sinc(n - m + 1/2)
+    S = np.sinc(a.range[:, np.newaxis] - b.range[np.newaxis, :] + 1 / 2)
+    Sb = S @ b.data
+    err = a.norm() ** 2 + b.norm() ** 2 - 2 * a.data @ Sb
+    return (
+        err,
+        signal(2 * (a.data - Sb), a.start),
+        signal(2 * (b.data - S.T @ a.data), b.start),
+    )
+
+
+def _scaling_function_sup(w, levels, rtol):
+    """Return max |phi(x)| for the scaling function phi of w, approximated by the cascade algorithm."""
+    s, sup = signal([1.0]), None
+    for level in range(1, levels + 1):
+        s = w.reconstruct(scaling=s)
+        previous, sup = sup, np.max(np.abs(s.data)) * 2 ** (level / 2)
+        if (
+            rtol is not None
+            and previous is not None
+            and abs(sup - previous) < rtol * sup
+        ):
+            break
+    return sup
+
+
+def _mpmath():
+    try:
+        import mpmath
+    except ImportError:
+        raise ImportError("High-precision filter design requires mpmath.") from None
+    return mpmath.mp
+
+
+def _mp_convolve(a, b):
+    c = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            c[i + j] += x * y
+    return c
+
+
+def _mp_allpass(mp, tau, L):
+    d = [mp.mpf(1)]
+    for n in range(L):
+        d.append(d[-1] * (L - n) * (L - n - tau) / (n + 1) / (n + 1 + tau))
+    return d
+
+
+@functools.lru_cache(maxsize=None)
+def _allpass_mp(tau, L, precision):
+    mp = _mpmath()
+    with mp.workdps(precision):
+        return tuple(float(x) for x in _mp_allpass(mp, mp.mpf(tau), L))
+
+
+def _mp_sfact(mp, h, min_phase, eps):
+    """Multiple-precision version of sfact (the roots are ordered as in sfact, but Leja ordering is not needed)."""
+    isreal = all(mp.im(x) == 0 for x in h)
+    roots = mp.polyroots(h[::-1], maxsteps=50 * len(h), extraprec=mp.prec, asc=True)
+    roots = [mp.mpc(r) for r in roots]
+
+    # classify roots on unit circle
+    roots_circ = [r for r in roots if abs(abs(r) - 1) < eps]
+    assert (
+        len(roots_circ) % 2 == 0
+    ), "There should be an even number of roots of unit modulus."
+    if min_phase and len(roots_circ) > 0:
+        raise NotImplementedError
+
+    # all roots on unit circle should appear an even number of times
+    num_plus_one = sum(1 for r in roots_circ if abs(r - 1) < eps)
+    assert num_plus_one % 2 == 0, "The root +1 should appear an even number of times."
+    others = sorted((r for r in roots_circ if abs(r - 1) >= eps), key=mp.arg)
+    roots_circ = [(a + b) / 2 for a, b in zip(others[::2], others[1::2])]
+    roots_circ += [mp.mpc(1)] * (num_plus_one // 2)
+
+    # roots inside unit disk (choose the same ones as sfact, which uses scipy.signal._filter_design._cplxreal)
+    roots_int = [r for r in roots if abs(r) <= 1 - eps]
+    if isreal and not min_phase:
+        tol = mp.mpf(10) ** (-mp.dps // 2)
+        reals = sorted(mp.re(r) for r in roots_int if abs(mp.im(r)) <= tol * abs(r))
+        pos_imags = sorted(
+            (r for r in roots_int if mp.im(r) > tol * abs(r)),
+            key=lambda r: (mp.re(r), abs(mp.im(r))),
+        )
+        A1, A2 = pos_imags[::2], pos_imags[1::2]
+        roots_int = [1 / r for r in A1 + [mp.conj(r) for r in A1]]
+        roots_int += A2 + [mp.conj(r) for r in A2]
+        roots_int += [1 / r for r in reals[::2]] + reals[1::2]
+
+    # build corresponding polynomial
+    g = [mp.mpf(1)]
+    for r in roots_circ + roots_int:
+        g = _mp_convolve(g, [1, -r])
+    g = [x * mp.sqrt(h[-1] / (g[0] * g[-1])) for x in g]
+    if isreal:
+        g = [mp.re(x) for x in g]
+        if min(g) + max(g) < 0:
+            g = [-x for x in g]
+    return g
+
+
+@functools.lru_cache(maxsize=None)
+def _sfact_mp(h, min_phase, eps, precision):
+    mp = _mpmath()
+    with mp.workdps(precision):
+        g = _mp_sfact(mp, [mp.mpmathify(x) for x in h], min_phase, eps)
+        g = tuple(complex(x) if isinstance(x, mp.mpc) else float(x) for x in g)
+
+    # check that g is indeed a spectral factor of h
+    assert np.allclose(
+        np.convolve(g, np.conj(g[::-1])), h, atol=0
+    ), "No spectral factor"
+    return g
+
+
+@functools.lru_cache(maxsize=None)
+def _selesnick_hwlet_mp(K, L, min_phase, precision):
+    """Return scaling filters of selesnick_hwlet(K, L, min_phase), computed with the given number of decimal digits."""
+    mp = _mpmath()
+    with mp.workdps(precision):
+        d = _mp_allpass(mp, mp.mpf(1) / 2, L)
+
+        # filter for z^(K+L) S(z)
+        s1 = [mp.mpf(math.comb(2 * K, n)) for n in range(2 * K + 1)]
+        s = _mp_convolve(s1, _mp_convolve(d, d[::-1]))
+
+        # solve convolution system for z^(K+L-1) R(z)
+        N = 2 * (K + L) - 1
+        A = mp.matrix(N, N)
+        for i in range(N):
+            for j in range(N):
+                if 0 <= 2 * i + 1 - j < len(s):
+                    A[i, j] = s[2 * i + 1 - j]
+        b = mp.matrix(N, 1)
+        b[K + L - 1] = 1
+        r = mp.lu_solve(A, b)
+        r = [(r[n] + r[N - 1 - n]) / 2 for n in range(N)]
+
+        # find spectral factor Q(z) and compute filter for z^K F(z)
+        q = _mp_sfact(mp, r, min_phase, mp.mpf(10) ** (-precision // 4))
+        f = _mp_convolve(q, [math.comb(K, n) for n in range(K + 1)])
+        h = tuple(float(x) for x in _mp_convolve(f, d))
+        g = tuple(float(x) for x in _mp_convolve(f, d[::-1]))
+    return h, g
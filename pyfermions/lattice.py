@@ -0,0 +1,233 @@
+import numpy as np
+from .signal import *
+from .wavelets import *
+
+__all__ = ["paraunitary_lattice"]
+
+
+class paraunitary_lattice:
+    """
+    Factorization of a real orthogonal wavelet into a lattice of Givens rotations and delays.
+
+    The polyphase matrix M(z) = [[H_e(z), G_e(z)], [H_o(z), G_o(z)]], where H_e(z) = sum_j h[2j + parity] z^{-j} etc.,
+    is written as
+
+      M(z) = R(angles[0]) L(z) R(angles[1]) L(z) ... L(z) R(angles[-1]) diag(1, sign) diag(z^{-delays[0]}, z^{-delays[1]}),
+
+    where R(theta) = [[cos theta, -sin theta], [sin theta, cos theta]] and L(z) = diag(1, z^{-1}). In the language of
+    quantum circuits, the inverse wavelet transform is a brickwork circuit of two-site rotations by the given angles.
+    """
+
+    def __init__(self, angles, sign=1, delays=(0, 0), parity=0):
+        #: Rotation angles.
+        self.angles = np.array(angles, dtype=float)
+
+        #: Determinant of the constant part of the polyphase matrix (+1 or -1).
+        self.sign = sign
+
+        #: Delays of the scaling and wavelet coefficients.
+        self.delays = tuple(delays)
+
+        #: Offset of the even polyphase components (0 or 1).
+        self.parity = parity
+
+    def __repr__(self):
+        return "paraunitary_lattice(%r, sign=%d, delays=%r, parity=%d)" % (
+            self.angles,
+            self.sign,
+            self.delays,
+            self.parity,
+        )
+
+    @staticmethod
+    def from_wavelet(w, atol=1e-8, max_iter=100):
+        """
+        Factorize the given (real) orthogonal wavelet up to an error of at most atol in the filter taps.
+
+        The filters must be paraunitary to roughly atol. Long designs computed in double precision are not (e.g., those
+        of selesnick_hwlet(8, 8) are only orthogonal to about 1e-10), so they should be designed with the precision
+        argument of selesnick_hwlet instead. Very small taps at the boundary slow down the refinement of the angles, in
+        which case max_iter may need to be increased.
+        """
+        h, g = w.scaling_filter, w.wavelet_filter
+        assert np.isrealobj(h.data) and np.isrealobj(g.data), "Filters should be real."
+        parity = h.start % 2
+
+        # polyphase components of the filters, normalized so that the lowest power is z^0
+        delays, columns = [], []
+        for f in (h, g):
+            start = (f.start - parity) // 2
+            stop = (f.stop - parity + 1) // 2
+            column = np.zeros((stop - start, 2))
+            for n, x in zip(f.range, f.data):
+                column[(n - parity) // 2 - start, (n - parity) % 2] = x
+            delays.append(start)
+            columns.append(column)
+        degree = max(len(c) for c in columns) - 1
+        M = np.zeros((degree + 1, 2, 2))
+        for k, column in enumerate(columns):
+            M[: len(column), :, k] = column
+
+        # peel off one rotation and one delay at a time: M(z) = R(theta) L(z) M'(z), where the first row r of R(theta)^T
+        # should annihilate the highest coefficient of M(z) and the second row J r the lowest one
+        J = _rotation(np.pi / 2)
+        target, angles = M, []
+        for _ in range(degree):
+            A = J @ M[0] @ M[0].T @ J.T + M[-1] @ M[-1].T
+            r = np.linalg.eigh(A)[1][:, 0]
+            theta = np.arctan2(r[1], r[0])
+            M = _rotation(-theta) @ M
+            M = np.concatenate([M[:-1, :1], M[1:, 1:]], axis=1)
+            angles.append(theta)
+        angles.append(np.arctan2(M[0][1, 0], M[0][0, 0]))
+        sign = 1 if np.linalg.det(M[0]) > 0 else -1
+
+        # rounding errors are amplified by the peeling if the filters have small taps at the boundary, so we refine the
+        # angles by the Levenberg-Marquardt method
+        angles, damping = np.array(angles), 1e-3
+        residual = _polyphase(angles, sign) - target
+        for _ in range(max_iter):
+            if np.max(np.abs(residual)) < atol / 10:
+                break
+            jacobian = _polyphase_jacobian(angles, sign).reshape(len(angles), -1).T
+            A, b = jacobian.T @ jacobian, jacobian.T @ residual.ravel()
+            while damping < 1e10:
+                step = np.linalg.solve(A + damping * np.eye(len(angles)), b)
+                new_residual = _polyphase(angles - step, sign) - target
+                if np.sum(new_residual**2) < np.sum(residual**2):
+                    angles, residual, damping = (
+                        angles - step,
+                        new_residual,
+                        damping / 10,
+                    )
+                    break
+                damping *= 10
+        assert np.allclose(
+            _polyphase(angles, sign), target, rtol=0, atol=atol
+        ), "Filters do not form a paraunitary polyphase matrix of minimal degree."
+        return paraunitary_lattice(angles, sign, delays, parity)
+
+    def to_wavelet(self):
+        """Return the orthogonal wavelet described by the lattice."""
+        # the columns of the polyphase matrix are the images of unit scaling and wavelet coefficients
+        h = self.reconstruct(scaling=signal([1.0]))
+        g = self.reconstruct(wavelet=signal([1.0]))
+        return orthogonal_wavelet(h, g)
+
+    def reconstruct(self, scaling=None, wavelet=None):
+        """
+        Reconstruct signal from scaling and wavelet coefficients, like orthogonal_wavelet.reconstruct.
+
+        Each Givens rotation is applied as a butterfly with two multiplications, cos(theta) [[1, -t], [t, 1]] or
+        sin(theta) [[t, -1], [1, t]], and the product of the prefactors is applied once at the end. This takes about
+        half the multiplications of direct convolution with the filters.
+        """
+        if scaling is None:
+            scaling = signal()
+        if wavelet is None:
+            wavelet = signal()
+        N = len(self.angles)
+
+        # align delayed scaling and wavelet coefficients
+        a, b = scaling.shift(self.delays[0]), wavelet.shift(self.delays[1])
+        if a.data.size == 0:
+            a = signal(start=b.start)
+        if b.data.size == 0:
+            b = signal(start=a.start)
+        start, stop = min(a.start, b.start), max(a.stop, b.stop)
+        L = stop - start + N - 1
+        dtype = np.result_type(a.data, b.data, float)
+        u = np.zeros(L, dtype=dtype)
+        u[a.start - start : a.stop - start] = a.data
+        v_buffer = np.zeros(L + N - 1, dtype=dtype)
+        v = v_buffer[N - 1 : N - 1 + L]
+        v[b.start - start : b.stop - start] = self.sign * b.data
+
+        # apply rotations and delays (moving the window into v_buffer delays v by one step)
+        for k, theta in enumerate(self.angles[::-1]):
+            _butterfly(u, v, theta)
+            if k < N - 1:
+                v = v_buffer[N - 2 - k : N - 2 - k + L]
+        scale = _scale(self.angles)
+        data = np.empty(2 * L, dtype=dtype)
+        np.multiply(u, scale, out=data[::2])
+        np.multiply(v, scale, out=data[1::2])
+        return signal._wrap(data, 2 * start + self.parity)
+
+    def analyze(self, s):
+        """Decompose signal into scaling and wavelet coefficients, like orthogonal_wavelet.analyze."""
+        N = len(self.angles)
+
+        # split into polyphase components on the index range [start - N + 1, stop)
+        start = (s.start - self.parity) // 2
+        stop = (s.stop - self.parity + 1) // 2
+        L = stop - start + N - 1
+        dtype = np.result_type(s.data, float)
+        x = np.zeros(2 * (stop - start), dtype=dtype)
+        x[s.start - 2 * start - self.parity : s.stop - 2 * start - self.parity] = s.data
+        u = np.zeros(L, dtype=dtype)
+        v_buffer = np.zeros(L + N - 1, dtype=dtype)
+        v = v_buffer[:L]
+        u[N - 1 :], v[N - 1 :] = x[::2], x[1::2]
+
+        # apply inverse rotations and advances (moving the window into v_buffer advances v by one step)
+        for k, theta in enumerate(self.angles):
+            _butterfly(u, v, -theta)
+            if k < N - 1:
+                v = v_buffer[k + 1 : k + 1 + L]
+        scale = _scale(-self.angles)
+        u *= scale
+        v *= scale * self.sign
+        first = start - N + 1
+        return (
+            signal._wrap(u, first - self.delays[0]),
+            signal._wrap(v, first - self.delays[1]),
+        )
+
+
+def _rotation(theta):
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([[c, -s], [s, c]])
+
+
+def _polyphase(angles, sign=1):
+    """
+    Return coefficients M[j] of the polyphase matrix sum_j M[j] z^{-j} = R(angles[0]) L(z) ... L(z) R(angles[-1]) S,
+    where S = diag(1, sign).
+    """
+    M = (_rotation(angles[-1]) * [1, sign])[np.newaxis]
+    for theta in angles[-2::-1]:
+        delayed = np.zeros((len(M) + 1, 2, 2))
+        delayed[:-1, 0] = M[:, 0]
+        delayed[1:, 1] = M[:, 1]
+        M = _rotation(theta) @ delayed
+    return M
+
+
+def _polyphase_jacobian(angles, sign=1):
+    """Return derivatives of _polyphase(angles, sign) with respect to the angles (using R'(theta) = R(theta + pi/2))."""
+    shifts = np.eye(len(angles)) * np.pi / 2
+    return np.array([_polyphase(angles + shift, sign) for shift in shifts])
+
+
+def _scale(angles):
+    """Return product of the prefactors of the butterflies (see _butterfly)."""
+    c, s = np.abs(np.cos(angles)), np.abs(np.sin(angles))
+    return np.prod(np.where(c >= s, np.cos(angles), np.sin(angles)))
+
+
+def _butterfly(u, v, theta):
+    """Apply rotation by theta to the pairs (u, v) in place, up to the prefactor cos(theta) or sin(theta)."""
+    c, s = np.cos(theta), np.sin(theta)
+    if abs(c) >= abs(s):
+        t = s / c
+        tu = t * u
+        u -= t * v
+        v += tu
+    else:
+        t = c / s
+        tu = t * u
+        tu -= v
+        v *= t
+        v += u
+        u[...] = tu
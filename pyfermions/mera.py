@@ -1,49 +1,97 @@
+import collections, functools, itertools, math, os, threading, warnings
 import numpy as np
 from .utils import *
+from .utils import _check_allocation, _chunk_size
 from .signal import *
 from .wavelets import *
 from .hilbert import *
+from .storage import shared_handle, attach, _reduce_shared
 
-__all__ = ["mera1d", "mera2d"]
+__all__ = ["mera1d", "periodic_mera1d", "mera2d", "mera3d", "bosonic_mera"]
 
 
 class mera1d:
     """1D Gaussian MERA for approximate ground state of free-fermion Hamiltonian at half filling."""
 
-    def __init__(self, h, g):
-        """The wavelet instances h, g should form an approximate Hilbert pair."""
+    def __init__(self, h, g, dtype=None):
+        """
+        The wavelet instances h, g should form an approximate Hilbert pair. If dtype is given (e.g. np.float32), it is
+        used for cascades, overlaps and covariance matrices instead of the package-wide utils.compute_dtype.
+        """
         self.h, self.g = h, g
+        self.dtype = dtype
+        self._wavelets = {}
+        self._correlation_tables = {}
+        self._spectra = _spectrum_cache()
+
+    def __reduce_ex__(self, protocol):
+        # objects attached from shared memory are pickled as their storage.shared_handle
+        return _reduce_shared(self, protocol)
 
     @staticmethod
     def selesnick(K, L):
         return mera1d(*selesnick_hwlet(K, L))
 
-    def eigenmode_pair(self, level, x=0):
+    def eigenmode_pair(self, level, x=0, tol=None):
         """
         Return approximate (negative-energy) eigenmode pair (a,b) on even/odd sublattices that arise from inserting
         unit signals into the given level of the inverse wavelet transforms (level=1, 2, ...).
+
+        If tol is given, the negligible tails of the cascades are trimmed such that ||a - a'|| and ||b - b'|| are at
+        most tol, where a', b' are the exact signals (see orthogonal_wavelet._cascade). Both are defined on the same
+        range.
         """
         assert level >= 1
-        a = self.h.reconstruct(wavelet=signal([1], start=x))
-        b = self.g.reconstruct(wavelet=signal([1], start=x))
-        for _ in range(level - 1):
-            a = self.h.reconstruct(scaling=a)
-            b = self.g.reconstruct(scaling=b)
+        h, g = self._cast_wavelets()
+        a = h._cascade(
+            level, wavelet=signal(np.ones(1, h.wavelet_filter.data.dtype), x), tol=tol
+        )
+        b = g._cascade(
+            level, wavelet=signal(np.ones(1, g.wavelet_filter.data.dtype), x), tol=tol
+        )
+        if (a.start, a.stop) != (b.start, b.stop):
+            start, _, a_data, b_data = a._union_align(b)
+            a, b = signal._wrap(a_data, start), signal._wrap(b_data, start)
         return a, b
 
-    def eigenmode(self, level, x=0, positive_energy=False):
+    def _compute_dtype(self, *arrays):
+        """Return the dtype used for computations, made complex if any of the given arrays is complex."""
+        dtype = np.dtype(self.dtype) if self.dtype is not None else get_compute_dtype()
+        if any(np.iscomplexobj(a) for a in arrays):
+            dtype = np.result_type(dtype, np.complex64)
+        return dtype
+
+    def _cast_wavelets(self):
+        """Return the wavelets h, g with filters converted to the compute dtype (cached)."""
+        dtype = self._compute_dtype()
+        if dtype not in self._wavelets:
+            self._wavelets[dtype] = tuple(
+                w.astype(
+                    self._compute_dtype(w.scaling_filter.data, w.wavelet_filter.data)
+                )
+                for w in (self.h, self.g)
+            )
+        return self._wavelets[dtype]
+
+    def eigenmode(self, level, x=0, positive_energy=False, tol=None):
         """
         Return approximate (negative-energy) eigenmode on original lattice that arises from the given level of the MERA
-        (level=1, 2, ...).
+        (level=1, 2, ...). If tol is given, the l^2 error due to trimming the tails is at most tol (see eigenmode_pair).
         """
         assert level >= 1
-        a, b = self.eigenmode_pair(level, x)
-        a = a.modulate(-1.0).upsample()
-        b = b.modulate(-1.0).upsample().shift(1)
-        if not positive_energy:
-            psi = (a + b) / np.sqrt(2)
-        else:
-            psi = (a - b) / np.sqrt(2)
+        a, b = self.eigenmode_pair(level, x, tol)
+        return mera1d._eigenmode_of_pair(a, b, positive_energy)
+
+    @staticmethod
+    def _eigenmode_of_pair(a, b, positive_energy=False):
+        # psi[2n] = (-1)^n a[n] / sqrt(2) and psi[2n+1] = +-(-1)^n b[n] / sqrt(2), written into a single buffer
+        start = min(2 * a.start, 2 * b.start + 1)
+        stop = max(2 * a.stop - 1, 2 * b.stop)
+        psi = signal.zeros(start, stop, np.result_type(a.data, b.data))
+        for s, offset, sign in [(a, 0, 1), (b, 1, -1 if positive_energy else 1)]:
+            target = psi.data[2 * s.start + offset - start :: 2][: s.data.size]
+            np.divide(s.data, sign * math.sqrt(2), out=target)
+            target[(s.start + 1) % 2 :: 2] *= -1
         return psi
 
     @staticmethod
@@ -51,50 +99,458 @@ class mera1d:
         """Compute energy of given single-particle mode."""
         return -2 * np.real(psi.vdot(psi.shift(-1)))
 
-    def energy(self, levels):
-        """Compute energy of approximate ground state with levels MERA layers."""
-        E = []
-        for level in range(1, levels + 1):
-            psi = self.eigenmode(level)
-            E.append(mera1d.energy_of_mode(psi) / 2 ** (level + 1))
+    def energy(self, levels, executor=None, n_jobs=None, method="real", tol=None):
+        """
+        Compute energy of approximate ground state with levels MERA layers.
+
+        If method is "real", the eigenmodes of all levels are computed in real space, in parallel over the levels (see
+        utils.parallel_map). If method is "spectral", the energy of the level-l eigenmode, -Re(s - t) in terms of the
+        overlaps of its pair (see _pair_overlaps), is computed by quadrature in momentum space, using FFT grids on which
+        the result is exact. This is always done in double precision.
+
+        If tol is given (for method "real"), the eigenmodes are trimmed such that the energy changes by at most tol: the
+        hopping Hamiltonian has norm 2, so a (normalized) eigenmode with l^2 error tol / 2 changes its energy by at most
+        2 tol, and the level-l eigenmodes carry weight 1 / 2^(l+1).
+        """
+        assert method in ["real", "spectral"]
+        if method == "spectral":
+            assert tol is None, "tol is only supported for method 'real'"
+            s, t = self._pair_overlaps(levels)
+            return np.sum(-np.real(s - t) / 2.0 ** np.arange(2, levels + 2))
+        f = functools.partial(
+            self._energy_of_level, tol=None if tol is None else tol / 2
+        )
+        E = parallel_map(f, range(1, levels + 1), executor, n_jobs)
         return np.sum(E)
 
-    def correlation(self, dx, levels, x=None):
+    def _energy_of_level(self, level, tol=None):
+        psi = self.eigenmode(level, tol=tol)
+        return mera1d.energy_of_mode(psi) / 2 ** (level + 1)
+
+    def energy_gradient(self, levels):
+        """
+        Return energy of approximate ground state with levels MERA layers together with its gradients with respect to
+        the scaling filters of h and g (as signals on the same index ranges).
+
+        The gradients are computed by one forward and one adjoint pass through the cascades. They assume real filters
+        and wavelet filters determined by the scaling filters as in orthogonal_wavelet.from_scaling_filter. Perturbations
+        along the gradients do not preserve orthogonality in general. See hilbert.phase_error_gradient for the gradient
+        of the phase error.
+        """
+        h, g = self._cast_wavelets()
+        for w in (h, g):
+            assert np.isrealobj(w.scaling_filter.data), "Filters should be real."
+
+        # forward pass, storing the eigenmode pairs of all levels (unlike eigenmode_pair, a and b are not aligned to a
+        # common range, as _cascade_gradient starts from the wavelet filters)
+        pairs = [(h.wavelet_filter, g.wavelet_filter)]
+        for _ in range(levels - 1):
+            a, b = pairs[-1]
+            pairs.append((h.reconstruct(scaling=a), g.reconstruct(scaling=b)))
+
+        # energies and their adjoints with respect to the eigenmode pairs
+        E, a_bars, b_bars = 0, [], []
+        for level, (a, b) in enumerate(pairs, 1):
+            psi = mera1d._eigenmode_of_pair(a, b)
+            scale = 2 ** (level + 1)
+            E += mera1d.energy_of_mode(psi) / scale
+
+            # E(psi) = -2 sum_n psi[n] psi[n+1] and psi[2n] = (-1)^n a[n] / sqrt(2), psi[2n+1] = (-1)^n b[n] / sqrt(2)
+            padded = np.r_[0, psi.data, 0]
+            psi_bar = -2 * (padded[2:] + padded[:-2]) / scale
+            for s, offset, bars in [(a, 0, a_bars), (b, 1, b_bars)]:
+                bar = psi_bar[2 * s.start + offset - psi.start :: 2][: s.data.size]
+                bar = bar / math.sqrt(2)
+                bar[(s.start + 1) % 2 :: 2] *= -1
+                bars.append(bar)
+
+        grad_h = _cascade_gradient(h, [a for a, _ in pairs], a_bars)
+        grad_g = _cascade_gradient(g, [b for _, b in pairs], b_bars)
+        return E, grad_h, grad_g
+
+    def correlation(self, dx, levels, x=None, executor=None, n_jobs=None, tol=None):
         """Compute correlation function C(x, x+dx) of approximate ground state with levels MERA layers."""
         if x is None:
             x = np.array([0])
+        y = x[:, np.newaxis] + dx[np.newaxis, :]
+        return self.two_point(x[:, np.newaxis], y, levels, executor, n_jobs, tol)
 
-        C = np.zeros(shape=(x.size, dx.size))
-        for level in range(1, levels + 1):
-            psi = self.eigenmode(level)
-            for i, the_x in enumerate(x):
-                for j, the_dx in enumerate(dx):
-                    the_y = the_x + the_dx
-                    C[i, j] += (
-                        psi.shift(-the_y)
-                        .downsample(level + 1)
-                        .vdot(psi.shift(-the_x).downsample(level + 1))
-                    )
+    def correlation_kspace(self, dx, levels, x=None, N=None):
+        """
+        Compute correlation function C(x, x+dx) like correlation, but in momentum space.
 
+        For each level, the Fourier transform of the eigenmode is evaluated on a uniform grid of momenta using the Fourier
+        transforms of the filters, and the correlations for all distances are obtained at once by FFTs. The grid for the
+        deepest level has N points (a power of two), and it is halved for each level above. By default, N is chosen such
+        that the result is exact (up to rounding errors).
+        """
+        if x is None:
+            x = np.array([0])
+        dx = np.asarray(dx)
+        filters = [
+            f.data
+            for w in (self.h, self.g)
+            for f in (w.scaling_filter, w.wavelet_filter)
+        ]
+        C = np.zeros((x.size, dx.size), dtype=np.result_type(float, *filters))
+        for level, Psi in enumerate(self._eigenmode_fts(levels, N), 1):
+            C_level = self._correlation_kspace_of_level(x, dx, level, Psi)
+            C = C + (C_level.real if np.isrealobj(C) else C_level)
         return C
 
-    def covariance(self, stop, levels, start=None):
-        """Return covariance matrix <a_i^\\dagger a_j> of subsystem {start,...,stop-1}."""
+    def _correlation_kspace_of_level(self, x, dx, level, Psi):
+        N, P = len(Psi), 2 ** (level + 1)
+        start, stop = self._eigenmode_support(level)
+        psi = np.fft.ifft(Psi)
+
+        # sum_m conj(psi[P m + x + dx]) psi[P m + x] only depends on the residue of x modulo P
+        C = np.zeros((x.size, dx.size), dtype=complex)
+        valid = np.abs(dx) < stop - start
+        n = np.arange(N)
+        for r in np.unique(x % P):
+            psi_r = np.where((n - r) % P == 0, psi, 0)
+            c = np.fft.fft(Psi.conj() * np.fft.fft(psi_r)) / N
+            C[np.ix_(x % P == r, valid)] = c[dx[valid] % N]
+        return C
+
+    def _eigenmode_fts(self, levels, N=None):
+        """
+        Return list of Fourier transforms of eigenmode(level) for level = 1, ..., levels. The level-l Fourier transform is
+        sampled at momenta 2 pi n / N_l for n = 0, ..., N_l - 1, where N_l = 2^(l - levels) N. By default, N is chosen such
+        that N_l is at least twice the length of the eigenmode (hence its periodization determines all correlations).
+        """
+        Psis = []
+        for A, B in self._eigenmode_pair_fts(levels, N):
+            # modulate by (-1)^n, upsample, shift b by one site: psi(k) = (A(2k + pi) + e^{-ik} B(2k + pi)) / sqrt(2)
+            N_l = len(A)
+            n = np.arange(N_l)
+            idx = (2 * n + N_l // 2) % N_l
+            Psis.append((A[idx] + np.exp(-2j * np.pi * n / N_l) * B[idx]) / np.sqrt(2))
+        return Psis
+
+    def _eigenmode_pair_fts(self, levels, N=None):
+        """
+        Return list of Fourier transforms (A, B) of eigenmode_pair(level) for level = 1, ..., levels, sampled on the same
+        grids as in _eigenmode_fts.
+        """
+        if N is None:
+            lengths = [
+                np.subtract(*self._eigenmode_support(l)[::-1])
+                for l in range(1, levels + 1)
+            ]
+            N = max(
+                4 * 2**levels,
+                *(2 * L * 2 ** (levels - l) for l, L in enumerate(lengths, 1)),
+            )
+            N = 2 ** int(np.ceil(np.log2(N)))
+        assert N % 2 ** (levels + 1) == 0, "N should be a multiple of 2^(levels+1)"
+
+        # filter spectra on finest grid
+        H_s, G_s = self._spectrum_fft("h_s", N), self._spectrum_fft("g_s", N)
+        H_w, G_w = self._spectrum_fft("h_w", N), self._spectrum_fft("g_w", N)
+
+        pairs = []
+        for level in range(1, levels + 1):
+            # cascade A(k) -> A(2k) H_s(k), where the grid doubles with each level
+            stride = 2 ** (levels - level)
+            if level == 1:
+                A, B = H_w[::stride], G_w[::stride]
+            else:
+                A = np.tile(A, 2) * H_s[::stride]
+                B = np.tile(B, 2) * G_s[::stride]
+            pairs.append((A, B))
+        return pairs
+
+    def _pair_overlaps(self, levels, N=None):
+        """
+        Return arrays s, t with s[l-1] = sum_n conj(a[n]) b[n] and t[l-1] = sum_n conj(b[n]) a[n+1] for the eigenmode
+        pairs (a, b) of levels l = 1, ..., levels, computed by quadrature on the grids of _eigenmode_pair_fts (which is
+        exact up to rounding errors, since the grids are larger than the supports of the pairs). By default, the grids
+        are chosen as small as possible.
+        """
+        if N is None:
+            # the pair of level l is supported on about half as many sites as the eigenmode
+            spans = [
+                (stop - start) // 2 + 3
+                for start, stop in map(self._eigenmode_support, range(1, levels + 1))
+            ]
+            N = max(
+                2 ** (levels + 1),
+                *(span * 2 ** (levels - l) for l, span in enumerate(spans, 1)),
+            )
+            N = 2 ** int(np.ceil(np.log2(N)))
+        s, t = [], []
+        for A, B in self._eigenmode_pair_fts(levels, N):
+            N_l = len(A)
+            phase = np.exp(2j * np.pi * np.arange(N_l) / N_l)
+            s.append(np.vdot(A, B) / N_l)
+            t.append(np.vdot(B, A * phase) / N_l)
+        return np.array(s), np.array(t)
+
+    def _eigenmode_support(self, level):
+        """Return (start, stop) of eigenmode(level) without computing it."""
+
+        def cascade(w):
+            start, stop = w.wavelet_filter.start, w.wavelet_filter.stop
+            for _ in range(level - 1):
+                start = 2 * start + w.scaling_filter.start
+                stop = 2 * stop + w.scaling_filter.stop - 2
+            return start, stop
+
+        (a_start, a_stop), (b_start, b_stop) = cascade(self.h), cascade(self.g)
+        return min(2 * a_start, 2 * b_start + 1), max(2 * a_stop - 1, 2 * b_stop)
+
+    def covariance(
+        self,
+        stop=None,
+        levels=None,
+        start=None,
+        executor=None,
+        n_jobs=None,
+        out=None,
+        tile_size=1024,
+        tiles=None,
+        sites=None,
+    ):
+        """
+        Return covariance matrix <a_i^\\dagger a_j> of subsystem {start,...,stop-1}, or of an arbitrary subsystem if a
+        sequence of sites is given (in which case start and stop are ignored).
+
+        If out is given, the matrix is instead constructed tile by tile and written into out, which can be a
+        (memory-mapped) array, the filename of a .npy file (created if it does not exist yet) or the handle of a
+        storage.shared_array. The tiles have size at most tile_size and are distributed over executor or n_jobs. Only
+        the tiles (i, j) with i <= j are computed, the others are filled in by symmetry. To restart an interrupted
+        computation, pass the list of remaining tiles. Process pools are only supported when out is a filename or a
+        shared array.
+        """
+        x = self._sites(stop, start, sites)
+        if out is None:
+            return self.two_point(
+                x[:, np.newaxis], x[np.newaxis, :], levels, executor, n_jobs
+            )
+
+        # create output file if necessary
+        R = len(x)
+        if isinstance(out, (str, os.PathLike)) and not os.path.exists(out):
+            dtype = self._compute_dtype(
+                *(
+                    f.data
+                    for w in (self.h, self.g)
+                    for f in (w.scaling_filter, w.wavelet_filter)
+                )
+            )
+            np.lib.format.open_memmap(out, mode="w+", dtype=dtype, shape=(R, R)).flush()
+        if tiles is None:
+            num_tiles = (R + tile_size - 1) // tile_size
+            tiles = [(i, j) for i in range(num_tiles) for j in range(i, num_tiles)]
+
+        f = functools.partial(self._write_covariance_tile, out, x, levels, tile_size)
+        parallel_map(f, tiles, executor, n_jobs)
+        if isinstance(out, shared_handle):
+            return attach(out)
+        return (
+            np.load(out, mmap_mode="r+") if isinstance(out, (str, os.PathLike)) else out
+        )
+
+    def covariance_tiles(
+        self, stop=None, levels=None, start=None, tile_size=1024, sites=None
+    ):
+        """
+        Iterate over the tiles (rows, cols, block) of the covariance matrix of subsystem {start,...,stop-1} (or of the
+        given sites), where rows and cols are slices such that C[rows, cols] = block. The full matrix is never materialized.
+        """
+        x = self._sites(stop, start, sites)
+        R = len(x)
+        for i in range(0, R, tile_size):
+            for j in range(0, R, tile_size):
+                rows = slice(i, min(i + tile_size, R))
+                cols = slice(j, min(j + tile_size, R))
+                yield rows, cols, self._covariance_block(x, rows, cols, levels)
+
+    @staticmethod
+    def _sites(stop, start, sites):
+        if sites is not None:
+            return np.asarray(sites)
         if start is None:
             start = 0
-        x = np.arange(start, stop)
-        C = np.zeros(shape=(x.size, x.size))
-        for level in range(1, levels + 1):
-            psi = self.eigenmode(level)
-            for i, the_x in enumerate(x):
-                for j, the_y in enumerate(x):
-                    C[i, j] += (
-                        psi.shift(-the_y)
-                        .downsample(level + 1)
-                        .vdot(psi.shift(-the_x).downsample(level + 1))
-                    )
+        return np.arange(start, stop)
+
+    def _covariance_block(self, x, rows, cols, levels):
+        return self.two_point(x[rows, np.newaxis], x[np.newaxis, cols], levels)
+
+    def _write_covariance_tile(self, out, x, levels, tile_size, tile):
+        if isinstance(out, (str, os.PathLike)):
+            out = np.load(out, mmap_mode="r+")
+        elif isinstance(out, shared_handle):
+            out = attach(out)
+        i, j = tile
+        rows = slice(i * tile_size, min((i + 1) * tile_size, len(x)))
+        cols = slice(j * tile_size, min((j + 1) * tile_size, len(x)))
+        block = self._covariance_block(x, rows, cols, levels)
+        out[rows, cols] = block
+        out[cols, rows] = block.T.conj()
+        if isinstance(out, np.memmap):
+            out.flush()
+
+    def covariance_operator(self, start, stop, levels):
+        """
+        Return covariance matrix of subsystem {start,...,stop-1} as a scipy.sparse.linalg.LinearOperator.
+
+        Only the eigenmodes are stored. Each level's contribution is a block-Toeplitz matrix, and its matrix-vector products
+        are computed using FFTs or, if only few translates of the eigenmode overlap with the subsystem, by projecting onto
+        those.
+        """
+        from scipy.sparse.linalg import LinearOperator
+
+        matvecs = [
+            self._covariance_matvec(start, stop, level)
+            for level in range(1, levels + 1)
+        ]
+        dtype = np.result_type(
+            self._compute_dtype(),
+            *(self._correlation_table(level).dtype for level in range(1, levels + 1)),
+        )
+
+        def matvec(v):
+            v = np.ravel(v)
+            out = np.zeros(stop - start, dtype=np.result_type(dtype, v))
+            for f in matvecs:
+                out += f(v)
+            return out
+
+        R = stop - start
+        return LinearOperator((R, R), matvec=matvec, rmatvec=matvec, dtype=dtype)
+
+    def _covariance_matvec(self, start, stop, level):
+        """
+        Return function computing v -> C v, where C[x,y] = sum_m psi[P m + x] conj(psi[P m + y]) is the contribution of the
+        given level to the covariance matrix of subsystem {start,...,stop-1} (P = 2^(level+1)).
+        """
+        import scipy.fft
+
+        psi = self.eigenmode(level)
+        a, R, P = psi.data, stop - start, 2 ** (level + 1)
+        isreal = np.isrealobj(a)
+
+        La = len(a)
+        nfft = scipy.fft.next_fast_len(2 * La + R - 2)
+
+        # few translates overlap with subsystem: compute B^T (conj(B) v) with B[m, i] = psi[P m + start + i]
+        m = np.arange(-((stop - 1 - psi.start) // P), (psi.stop - 1 - start) // P + 1)
+        if len(m) * R <= 4 * nfft:
+            idx = P * m[:, np.newaxis] + np.arange(start, stop) - psi.start
+            valid = (0 <= idx) & (idx < La)
+            B = np.where(valid, a[np.where(valid, idx, 0)], 0)
+            return lambda v: B.T @ (B.conj() @ v)
+
+        # otherwise, correlate with psi, keep every P-th coefficient, and convolve with psi
+        F1 = np.fft.fft(a[::-1].conj(), nfft)
+        F2 = np.fft.fft(a, nfft)
+        mask = (np.arange(La + R - 1) - (La - 1 - start + psi.start)) % P != 0
+
+        def matvec(v):
+            c = np.fft.ifft(F1 * np.fft.fft(v, nfft))[: La + R - 1]
+            c[mask] = 0
+            out = np.fft.ifft(F2 * np.fft.fft(c, nfft))[La - 1 : La - 1 + R]
+            return out.real if isreal and np.isrealobj(v) else out
+
+        return matvec
+
+    def two_point(self, x, y, levels, executor=None, n_jobs=None, tol=None):
+        """
+        Return two-point function C(x, y) of approximate ground state with levels MERA layers for arbitrary (broadcastable)
+        integer arrays of sites x and y.
+
+        If tol is given, the eigenmodes are trimmed such that every value changes by at most tol: by the Cauchy-Schwarz
+        inequality over the translates of a (normalized) eigenmode with l^2 error eps, the contribution of its level
+        changes by at most 2 eps, so eps = tol / (2 levels) is used.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x), np.asarray(y))
+        if tol is not None:
+            tol = tol / (2 * levels)
+        f = functools.partial(self._two_point_of_level, x, y, tol=tol)
+        Cs = parallel_map(f, range(1, levels + 1), executor, n_jobs)
+        C = np.zeros(x.shape, dtype=np.result_type(self._compute_dtype(), *Cs))
+        for C_level in Cs:
+            C += C_level
         return C
 
+    def _two_point_of_level(self, x, y, level, chunk_size=2**20, tol=None):
+        """
+        Return contribution of given level to the two-point function C(x, y) (x, y should have the same shape), using
+        the eigenmode trimmed with the given tol (see eigenmode).
+
+        The contribution sum_m conj(psi[P m + y]) psi[P m + x], where psi is the eigenmode and P = 2^(level+1), only
+        depends on x, y through their residues and quotients modulo P. It is evaluated by vectorized lookups into the
+        polyphase components of psi (see _correlation_table).
+        """
+        return _table_two_point(self._correlation_table(level, tol), x, y, chunk_size)
+
+    def _correlation_table(self, level, tol=None):
+        """
+        Return the polyphase components table[r, n + j] = psi[P (q0 + j) + r] of the level's eigenmode psi (trimmed with
+        the given tol), where P = 2^(level+1) and q0 is arbitrary. The table is padded by n columns of zeros on either
+        side.
+        """
+        key = (level, self._compute_dtype())
+        if tol is not None:
+            key += (tol,)
+        if key not in self._correlation_tables:
+            self._correlation_tables[key] = _polyphase_table(
+                self.eigenmode(level, tol=tol), 2 ** (level + 1)
+            )
+        return self._correlation_tables[key]
+
+    def iter_energy(self, max_levels=None):
+        """
+        Iterate over triples (level, E, delta), where E is the energy with level MERA layers and delta is the absolute
+        value of the contribution of the last layer. The contributions decay geometrically, so delta estimates the error.
+        """
+        E = 0
+        for level in itertools.islice(itertools.count(1), max_levels):
+            delta = self._energy_of_level(level)
+            E += delta
+            yield level, E, abs(delta)
+
+    def energy_adaptive(self, tol, max_levels=30):
+        """Compute energy with as many MERA layers as needed for contributions to drop below tol; return (E, levels)."""
+        return _converge(self.iter_energy(max_levels), tol, max_levels)
+
+    def iter_two_point(self, x, y, max_levels=None):
+        """
+        Iterate over triples (level, C, error), where C is the two-point function C(x, y) with level MERA layers (see
+        two_point) and error is a rigorous bound on the difference to the infinite MERA.
+
+        The bound follows from the Cauchy-Schwarz inequality, since the remaining layers contribute a total of
+        1/2 - C(x, x) to the diagonal.
+        """
+        # the diagonal terms only depend on x and y, so they are computed before broadcasting (e.g., on R sites
+        # rather than on the R x R grid for covariance matrices)
+        x_diag, y_diag = np.asarray(x), np.asarray(y)
+        x, y = np.broadcast_arrays(x_diag, y_diag)
+        C, T_x, T_y = 0, 1 / 2, 1 / 2
+        for level in itertools.islice(itertools.count(1), max_levels):
+            C = C + self._two_point_of_level(x, y, level)
+            T_x = T_x - self._two_point_of_level(x_diag, x_diag, level).real
+            T_y = T_y - self._two_point_of_level(y_diag, y_diag, level).real
+            yield level, C, np.sqrt(np.maximum(T_x, 0) * np.maximum(T_y, 0))
+
+    def correlation_adaptive(self, dx, tol, x=None, max_levels=30):
+        """Compute correlation function C(x, x+dx) up to error tol (see correlation); return (C, levels)."""
+        if x is None:
+            x = np.array([0])
+        y = x[:, np.newaxis] + dx[np.newaxis, :]
+        it = self.iter_two_point(x[:, np.newaxis], y, max_levels)
+        return _converge(it, tol, max_levels)
+
+    def covariance_adaptive(
+        self, tol, stop=None, start=None, sites=None, max_levels=30
+    ):
+        """Compute covariance matrix up to error tol (see covariance); return (C, levels)."""
+        x = self._sites(stop, start, sites)
+        it = self.iter_two_point(x[:, np.newaxis], x[np.newaxis, :], max_levels)
+        return _converge(it, tol, max_levels)
+
     def h_scaling(self, level, k):
         """
         Return single-particle scaling Hamiltonian (renormalized Hamiltonian) at given level
@@ -115,28 +571,462 @@ class mera1d:
         assert level >= 1
         return np.abs(self._h_renormalized(level, k, wavelet=True))
 
+    def dispersions(self, levels, k):
+        """
+        Return dispersion relations of the scaling and of the wavelet Hamiltonians for all given levels as two arrays of
+        shape (len(levels), len(k)). The wavelet dispersion relation for level 0 is undefined (nan).
+
+        All levels are computed in a single pass (which costs about as much as computing the deepest level).
+        """
+        levels = list(levels)
+        k = np.asarray(k, dtype=float)
+        e_s = np.full((len(levels), k.size), np.nan)
+        e_w = np.full((len(levels), k.size), np.nan)
+        for i, level in enumerate(levels):
+            if level == 0:
+                e_s[i] = np.abs(np.exp(1j * k) - 1)
+        it = self._iter_h_renormalized(max(levels), k)
+        for level, (h_s, h_w) in enumerate(it, 1):
+            for i in np.flatnonzero(np.array(levels) == level):
+                e_s[i], e_w[i] = np.abs(h_s), np.abs(h_w)
+        return e_s, e_w
+
     def _h_renormalized(self, level, k, wavelet=False):
         """Return [1,0] matrix element of level-l single-particle Hamiltonian in k-space."""
         if level == 0:
             return np.exp(1j * k) - 1
+        *_, (h_s, h_w) = self._iter_h_renormalized(level, k)
+        return h_w if wavelet else h_s
+
+    def _iter_h_renormalized(self, max_level, k):
+        """
+        Iterate over the [1,0] matrix elements (h_s, h_w) of the level-l scaling and wavelet Hamiltonians in k-space for
+        level = 1, ..., max_level.
 
-        H = self.h.wavelet_filter.ft if wavelet else self.h.scaling_filter.ft
-        G = self.g.wavelet_filter.ft if wavelet else self.g.scaling_filter.ft
-        a = G(k / 2).conj() * H(k / 2) * self._h_renormalized(level - 1, k / 2)
-        b = (
-            G(k / 2 + np.pi).conj()
-            * H(k / 2 + np.pi)
-            * self._h_renormalized(level - 1, k / 2 + np.pi)
+        Unrolling the recursion h_l(k) = (F(k/2) h_{l-1}(k/2) + F(k/2 + pi) h_{l-1}(k/2 + pi)) / 2, where F = G^* H, gives
+
+          h_l(k) = 2^(-l) sum_m F_1(omega_1[m mod 2]) P_l[m] h_0(omega_l[m]),
+
+        where omega_j[m] = (k + 2 pi m) / 2^j, P_l[m] = prod_{j=2}^l F_s(omega_j[m mod 2^j]), and F_1 = F_s for the
+        scaling Hamiltonian and F_w for the wavelet Hamiltonian. The products P_l are shared between the levels.
+
+        The grids have 2^max_level points per momentum, so the momenta are processed in chunks that keep the grids small
+        (and within the memory budget, see utils.memory_budget).
+        """
+        k = np.asarray(k, dtype=float)
+        points = 2**max_level
+        item_bytes = 16 * 6 * points
+        step = min(
+            _chunk_size(k.size, item_bytes, 0, "mera1d dispersions"),
+            max(_GRID_POINTS // points, 1),
         )
-        return (a + b) / 2
+        if step >= k.size:
+            yield from self._iter_h_renormalized_chunk(max_level, k)
+            return
+        h = np.empty((max_level, 2, k.size), dtype=complex)
+        flat = k.ravel()
+        for i in range(0, k.size, step):
+            for level, h_level in enumerate(
+                self._iter_h_renormalized_chunk(max_level, flat[i : i + step])
+            ):
+                h[level, :, i : i + step] = h_level
+        for h_s, h_w in h:
+            yield h_s.reshape(k.shape), h_w.reshape(k.shape)
+
+    def _iter_h_renormalized_chunk(self, max_level, k):
+        F_s1 = self._spectrum("g_s", k, 1).conj() * self._spectrum("h_s", k, 1)
+        F_w1 = self._spectrum("g_w", k, 1).conj() * self._spectrum("h_w", k, 1)
+        P = np.ones((2,) + k.shape)
+        for level in range(1, max_level + 1):
+            if level > 1:
+                F_s = self._spectrum("g_s", k, level).conj() * self._spectrum(
+                    "h_s", k, level
+                )
+                P = np.concatenate([P, P]) * F_s
+            omega = self._grid(k, level)
+            X = (P * (np.exp(1j * omega) - 1)).reshape((-1, 2) + k.shape).sum(axis=0)
+            yield np.sum(F_s1 * X, axis=0) / 2**level, np.sum(
+                F_w1 * X, axis=0
+            ) / 2**level
+
+    @staticmethod
+    def _grid(k, depth):
+        m = np.arange(2**depth).reshape((-1,) + (1,) * k.ndim)
+        return (k + 2 * np.pi * m) / 2**depth
+
+    def _filter(self, name):
+        w = {"h": self.h, "g": self.g}[name[0]]
+        return {"s": w.scaling_filter, "w": w.wavelet_filter}[name[2]]
+
+    def _spectrum(self, name, k, depth):
+        """
+        Return Fourier transform of the filter name (h_s, h_w, g_s, or g_w) at the frequencies (k + 2 pi m) / 2^depth for
+        m = 0, ..., 2^depth - 1.
+
+        Since exp(-i n (k + 2 pi m) / 2^depth) only depends on n mod 2^depth through its m-dependence, the transform is
+        an FFT (along m) of the phase-shifted filter periodized to length 2^depth.
+        """
+        f, N = self._filter(name), 2**depth
+        k = np.asarray(k)
+        a = np.zeros((N,) + k.shape, dtype=np.result_type(f.data, complex))
+        for n, s in zip(f.range, f.data):
+            a[n % N] += s * np.exp(-1j * n * k / N)
+        return np.fft.fft(a, axis=0)
+
+    def _spectrum_fft(self, name, N):
+        """Return Fourier transform of the filter name at the momenta 2 pi n / N for n = 0, ..., N-1 (cached)."""
+        key = (name, "fft", N)
+        return self._spectra.get(key, lambda: self._filter(name).fft(N))
+
+
+# number of frequencies per chunk when evaluating the renormalized Hamiltonians (see mera1d._iter_h_renormalized)
+_GRID_POINTS = 2**16
+
+
+class _spectrum_cache:
+    """Least-recently used cache for filter spectra, which evicts entries once they take up more than max_bytes."""
+
+    def __init__(self, max_bytes=2**28):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return cached value for key, or compute and cache it."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = compute()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self._bytes += value.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __getstate__(self):
+        # caches are not transferred to other processes
+        return {"max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+def _cascade_gradient(w, modes, adjoints):
+    """
+    Backpropagate adjoints through the cascade modes[l] = upsample(modes[l-1]) * w.scaling_filter, starting from
+    modes[0] = w.wavelet_filter, and return the resulting gradient with respect to the scaling filter of w.
+    """
+    f = w.scaling_filter
+    grad = np.zeros_like(f.data)
+    bar = adjoints[-1]
+    for l in range(len(modes) - 1, 0, -1):
+        # c = x^ * f implies f_bar[j] = sum_m x[m] c_bar[2m + j] and x_bar[m] = sum_j f[j] c_bar[2m + j]
+        grad += np.correlate(bar, modes[l - 1].upsample().data, "valid")
+        bar = adjoints[l - 1] + np.correlate(bar, f.data, "valid")[::2]
+
+    # the map from scaling to wavelet filter is a signed permutation, so its transpose is its inverse
+    bar = signal(bar, modes[0].start)
+    return (
+        signal(grad, f.start)
+        + orthogonal_wavelet.from_wavelet_filter(bar).scaling_filter
+    )
+
+
+def _polyphase_table(psi, P):
+    """
+    Return the polyphase components table[r, n + j] = psi[P (q0 + j) + r] of the signal psi, where q0 is arbitrary.
+    The table is padded by n columns of zeros on either side.
+    """
+    q0 = psi.start // P
+    n = -(-(psi.stop - q0 * P) // P)
+    table = np.zeros((P, 3 * n), dtype=psi.data.dtype)
+    table[:, n : 2 * n].T.flat[psi.start - q0 * P : psi.stop - q0 * P] = psi.data
+    return table
+
+
+def _table_two_point(table, x, y, chunk_size=2**20):
+    """
+    Return sum_m conj(psi[P m + y]) psi[P m + x] for integer arrays x, y of the same shape, where table is the output of
+    _polyphase_table(psi, P). The sum only depends on x, y through their residues and quotients modulo P, so it is
+    evaluated by vectorized lookups.
+    """
+    P, n = table.shape[0], table.shape[1] // 3
+    qx, rx = np.divmod(x.ravel(), P)
+    qy, ry = np.divmod(y.ravel(), P)
+    dq = np.clip(qy - qx, -n, n)
+
+    # sum_j conj(table[ry, n + j + dq]) table[rx, n + j]
+    C = np.zeros(x.size, dtype=table.dtype)
+    j = np.arange(n)
+    step = max(chunk_size // max(n, 1), 1)
+    for i in range(0, x.size, step):
+        s = slice(i, i + step)
+        a = table[ry[s, np.newaxis], n + dq[s, np.newaxis] + j]
+        b = table[rx[s, np.newaxis], n + j]
+        C[s] = np.einsum("ij,ij->i", a.conj(), b)
+    return C.reshape(x.shape)
+
+
+def _analyze_windows(rows, offsets, f):
+    """
+    Return (rows', offsets') such that c_i[m] = rows'[i, m - offsets'[i]], where c_i[m] = sum_k s_i[k] f[k - 2m] are
+    the coefficients obtained by analyzing the signals s_i[k] = rows[i, k - offsets[i]] with the filter f (cf.
+    orthogonal_wavelet.analyze).
+    """
+    U, W = rows.shape
+    M = len(f.data)
+
+    # full cross-correlation e[u] = sum_i rows[i] f[f.start + i - u + M - 1], padded to even length
+    T = W + M - 1
+    e = np.zeros((U, T + T % 2), dtype=np.result_type(rows, f.data))
+    for q, f_q in enumerate(f.data):
+        e[:, M - 1 - q : M - 1 - q + W] += f_q * rows
+
+    # c_i[m] = e[2m + M - 1 + f.start - offsets[i]] (so only every other entry is needed)
+    parity = (M - 1 + f.start - offsets) % 2
+    rows = np.where(parity[:, np.newaxis] == 0, e[:, 0::2], e[:, 1::2])
+    return rows, (parity - M + 1 - f.start + offsets) // 2
+
+
+def _windows_two_point(rows, offsets, i, j, chunk_size=2**20):
+    """Return sum_m conj(c_j[m]) c_i[m] for the coefficients c_i[m] = rows[i, m - offsets[i]] (cf. _analyze_windows)."""
+    U, W = rows.shape
+    padded = np.zeros((U, 3 * W), dtype=rows.dtype)
+    padded[:, W : 2 * W] = rows
+    d = np.clip(offsets[i] - offsets[j], -W, W)
+
+    # sum_t conj(rows[j, t + d]) rows[i, t]
+    C = np.zeros(len(i), dtype=rows.dtype)
+    t = np.arange(W)
+    step = max(chunk_size // W, 1)
+    for n in range(0, len(i), step):
+        s = slice(n, n + step)
+        a = padded[j[s, np.newaxis], W + d[s, np.newaxis] + t]
+        C[s] = np.einsum("ij,ij->i", a.conj(), rows[i[s]])
+    return C
+
+
+def _converge(it, tol, max_levels):
+    """Consume triples (levels, value, error) until error < tol and return (value, levels)."""
+    assert (
+        isinstance(max_levels, (int, np.integer)) and max_levels >= 1
+    ), "max_levels should be a positive integer"
+    for levels, value, error in it:
+        if np.max(error) < tol:
+            return value, levels
+    warnings.warn("Did not converge within %d levels." % max_levels)
+    return value, levels
+
+
+class periodic_mera1d:
+    """
+    1D Gaussian MERA on a periodic chain of N = 2^M sites, e.g. for comparison with exact diagonalization.
+
+    The wavelet transforms are circular (see orthogonal_wavelet.analyze_periodic), so the eigenmodes of level l = 1, ...,
+    M - 1 are the periodizations of those of mera1d. The two scaling modes that remain at the top are degenerate (with
+    zero energy), and the one with the sign convention of the negative-energy eigenmodes is occupied, so that the state
+    is at half filling. Observables are computed from the Fourier transforms of the eigenmodes, which are obtained by
+    cascading the filter spectra on the grid of N momenta.
+    """
+
+    def __init__(self, h, g, N, dtype=None):
+        """The wavelet instances h, g should form an approximate Hilbert pair (see mera1d for dtype)."""
+        assert N >= 4 and N & (N - 1) == 0, "N should be a power of two (at least 4)"
+        self.h, self.g = h, g
+        self.N = N
+        self.dtype = dtype
+        self._tables = {}
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_shared(self, protocol)
+
+    @staticmethod
+    def selesnick(K, L, N):
+        return periodic_mera1d(*selesnick_hwlet(K, L), N)
+
+    @property
+    def max_levels(self):
+        """Number of MERA levels, log2(N) - 1."""
+        return self.N.bit_length() - 2
+
+    def eigenmode_pair(self, level, x=0):
+        """
+        Return approximate (negative-energy) eigenmode pair (a,b) on the even/odd sublattices (arrays of length N/2) that
+        arise from inserting a unit wavelet coefficient at x into the given level of the circular inverse wavelet
+        transforms (level=1, ..., max_levels).
+        """
+        assert 1 <= level <= self.max_levels
+        n = self.N // 2 ** (level + 1)
+        unit = np.zeros(n)
+        unit[x % n] = 1
+        pair = []
+        for w in (self.h, self.g):
+            s = w.reconstruct_periodic(np.zeros(n), unit)
+            for _ in range(level - 1):
+                s = w.reconstruct_periodic(s, np.zeros_like(s))
+            pair.append(s)
+        return tuple(pair)
+
+    def eigenmode(self, level, x=0, positive_energy=False):
+        """
+        Return approximate (negative-energy) eigenmode on the chain (array of length N) that arises from the given level
+        of the MERA (level=1, ..., max_levels).
+        """
+        a, b = self.eigenmode_pair(level, x)
+        return periodic_mera1d._eigenmode_of_pair(a, b, positive_energy)
+
+    @staticmethod
+    def _eigenmode_of_pair(a, b, positive_energy=False):
+        # psi[2n] = (-1)^n a[n] / sqrt(2) and psi[2n+1] = +-(-1)^n b[n] / sqrt(2), which is periodic since N/2 is even
+        sign = (-1) ** np.arange(len(a)) / math.sqrt(2)
+        psi = np.empty(2 * len(a), dtype=np.result_type(a, b))
+        psi[::2] = sign * a
+        psi[1::2] = (-1 if positive_energy else 1) * sign * b
+        return psi
+
+    def _compute_dtype(self):
+        dtype = np.dtype(self.dtype) if self.dtype is not None else get_compute_dtype()
+        filters = [
+            f.data
+            for w in (self.h, self.g)
+            for f in (w.scaling_filter, w.wavelet_filter)
+        ]
+        if any(np.iscomplexobj(f) for f in filters):
+            dtype = np.result_type(dtype, np.complex64)
+        return dtype
+
+    def _eigenmode_fts(self, levels=None):
+        """
+        Return list of Fourier transforms of eigenmode(level) for level = 1, ..., levels (by default, max_levels) at the
+        momenta 2 pi n / N, together with the Fourier transform of the occupied top-level mode (None if levels is given).
+        """
+        N = self.N
+        H_s, G_s = self.h.scaling_filter.fft(N), self.g.scaling_filter.fft(N)
+        H_w, G_w = self.h.wavelet_filter.fft(N), self.g.wavelet_filter.fft(N)
+
+        # cascade A(k) -> A(2k) H_s(k) for the wavelet and scaling modes, and psi(k) = (A(2k + pi) + e^{-ik} B(2k + pi))
+        # / sqrt(2) as in mera1d._eigenmode_fts
+        n = np.arange(N)
+        double, idx = 2 * n % N, (2 * n + N // 2) % N
+        phase = np.exp(-2j * np.pi * n / N)
+        Psis = []
+        A, B, S, T = H_w, G_w, H_s, G_s
+        for level in range(1, (levels or self.max_levels) + 1):
+            if level > 1:
+                A, B = A[double] * H_s, B[double] * G_s
+                S, T = S[double] * H_s, T[double] * G_s
+            Psis.append((A[idx] + phase * B[idx]) / np.sqrt(2))
+        top = (S[idx] + phase * T[idx]) / np.sqrt(2) if levels is None else None
+        return Psis, top
+
+    def _mode(self, Psi):
+        """Return mode with the given Fourier transform (real if the filters are real)."""
+        psi = np.fft.ifft(Psi)
+        return psi.real if np.isrealobj(np.empty(0, self._compute_dtype())) else psi
+
+    @staticmethod
+    def _energy_of_ft(Psi):
+        """Compute energy -2 Re sum_n conj(psi[n]) psi[n+1] of mode with the given Fourier transform."""
+        N = len(Psi)
+        return -2 / N * np.sum(np.abs(Psi) ** 2 * np.cos(2 * np.pi * np.arange(N) / N))
+
+    def energy(self, levels=None):
+        """
+        Compute energy density of the MERA state with the given number of levels. By default, all levels and the
+        top-level mode are included, which gives the exact energy density of the state on the chain.
+        """
+        Psis, top = self._eigenmode_fts(levels)
+        E = sum(
+            self._energy_of_ft(Psi) / 2 ** (level + 1)
+            for level, Psi in enumerate(Psis, 1)
+        )
+        if top is not None:
+            E += self._energy_of_ft(top) / self.N
+        return E
+
+    def _block_table(self, level, psi):
+        """
+        Return the blocks B[q, u, r] = sum_m conj(psi[P m + r]) psi[P (m + q) + u] of the level's contribution
+        C[x, y] = B[(x // P - y // P) mod Q, x mod P, y mod P] to the covariance matrix, where P = 2^(level+1) and
+        Q = N / P. The sums over m are circular correlations, which are computed by FFTs.
+        """
+        P = 2 ** (level + 1)
+        F = np.fft.fft(psi.reshape(-1, P), axis=0)
+        B = np.fft.ifft(F[:, :, np.newaxis] * F[:, np.newaxis, :].conj(), axis=0)
+        return B.real if np.isrealobj(psi) else B
+
+    def two_point(self, x, y, levels=None):
+        """
+        Return two-point function C(x, y) for arbitrary (broadcastable) integer arrays of sites x and y (taken modulo N).
+        The blocks of each level (see _block_table) are cached, which takes memory O(N^2).
+        """
+        x, y = np.broadcast_arrays(np.asarray(x) % self.N, np.asarray(y) % self.N)
+        Psis, top = self._eigenmode_fts(levels)
+        C = np.zeros(x.shape, dtype=self._compute_dtype())
+        for level, Psi in enumerate(Psis, 1):
+            if level not in self._tables:
+                self._tables[level] = self._block_table(level, self._mode(Psi))
+            B, P = self._tables[level], 2 ** (level + 1)
+            C += B[(x // P - y // P) % len(B), x % P, y % P]
+        if top is not None:
+            psi = self._mode(top)
+            C += psi[x] * psi[y].conj()
+        return C
+
+    def covariance(self, stop=None, levels=None, start=None, sites=None):
+        """
+        Return covariance matrix of subsystem {start,...,stop-1} (by default, the whole chain) or of the given sites, like
+        mera1d.covariance. The full N x N matrix is assembled level by level in O(N^2) operations, by regrouping the
+        blocks of the lower levels into the larger blocks of the next level (see _regroup_blocks).
+        """
+        if stop is None and sites is None:
+            stop = self.N
+        x = mera1d._sites(stop, start, sites) % self.N
+        Psis, top = self._eigenmode_fts(levels)
+        C = None
+        for level, Psi in enumerate(Psis, 1):
+            B = self._block_table(level, self._mode(Psi))
+            C = B if C is None else _regroup_blocks(C) + B
+        while len(C) > 1:
+            C = _regroup_blocks(C)
+        C = C[0]
+        if top is not None:
+            psi = self._mode(top)
+            C += np.outer(psi, psi.conj())
+        return C[np.ix_(x, x)].astype(self._compute_dtype())
+
+
+def _regroup_blocks(B):
+    """
+    Given the blocks B[q] of a block-circulant matrix C[x, y] = B[(x // P - y // P) mod Q, x mod P, y mod P], return its
+    blocks of twice the size.
+    """
+    Q, P = B.shape[:2]
+    q = 2 * np.arange(Q // 2)[:, np.newaxis, np.newaxis]
+    a = np.arange(2)[:, np.newaxis]
+    blocks = B[(q + a - a.T) % Q]
+    return blocks.transpose(0, 1, 3, 2, 4).reshape(Q // 2, 2 * P, 2 * P)
 
 
 class mera2d:
     """2D Gaussian MERA for approximate ground state of free-fermion Hamiltonian at half filling."""
 
-    def __init__(self, h, g):
-        """The wavelet instances h, g should form an approximate Hilbert pair."""
-        self.mera1d = mera1d(h, g)
+    def __init__(self, h, g, dtype=None):
+        """The wavelet instances h, g should form an approximate Hilbert pair (see mera1d for dtype)."""
+        self.mera1d = mera1d(h, g, dtype)
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_shared(self, protocol)
 
     @staticmethod
     def selesnick(K, L):
@@ -155,6 +1045,8 @@ class mera2d:
 
         n = a_x.range
         m = a_y.range
+        itemsize = np.result_type(a_x.data, a_y.data, b_x.data, b_y.data).itemsize
+        _check_allocation(2 * n.size * m.size * itemsize, "mera2d.eigenmode_pair")
         a = np.outer(a_x.data, a_y.data)
         b = np.outer(b_x.data, b_y.data)
         return n, m, a, b
@@ -162,8 +1054,8 @@ class mera2d:
     @staticmethod
     def energy_of_mode_pair(n, m, a, b):
         """Compute energy of given single-particle mode pair (no need to go to original lattice)."""
-        a = a / np.sqrt(2)
-        b = b / np.sqrt(2)
+        a = a / math.sqrt(2)
+        b = b / math.sqrt(2)
 
         E = (
             np.tensordot(a.conj(), b)
@@ -173,12 +1065,367 @@ class mera2d:
         )
         return -2 * np.real(E)
 
-    def energy(self, levels_x, levels_y):
-        """Compute energy of approximate ground state with branching MERA truncated at given numbers of layers."""
-        E = []
-        for level_x in range(1, levels_x + 1):
-            for level_y in range(1, levels_y + 1):
-                n, m, a, b = self.eigenmode_pair(level_x, level_y)
-                e = mera2d.energy_of_mode_pair(n, m, a, b)
-                E.append(e / 2 ** (level_x + level_y + 1))
+    def energy(self, levels_x, levels_y, executor=None, n_jobs=None, method="real"):
+        """
+        Compute energy of approximate ground state with branching MERA truncated at given numbers of layers.
+
+        If method is "real", the mode pairs are computed in real space, in parallel over the level pairs (see
+        utils.parallel_map). If method is "spectral", the mode pairs are products of 1D eigenmode pairs, so their
+        energies (see energy_of_mode_pair) factorize into the overlaps computed by mera1d._pair_overlaps in momentum
+        space, and no 2D arrays are formed.
+        """
+        assert method in ["real", "spectral"]
+        if method == "spectral":
+            s, t = self.mera1d._pair_overlaps(max(levels_x, levels_y))
+            u = s - t.conj()
+            return _separable_energy([u[:levels_x], u[:levels_y]])
+        pairs = [
+            (level_x, level_y)
+            for level_x in range(1, levels_x + 1)
+            for level_y in range(1, levels_y + 1)
+        ]
+        E = parallel_map(self._energy_of_level_pair, pairs, executor, n_jobs)
         return np.sum(E)
+
+    def _energy_of_level_pair(self, levels):
+        level_x, level_y = levels
+        a_x, b_x = self.mera1d.eigenmode_pair(level_x)
+        a_y, b_y = self.mera1d.eigenmode_pair(level_y)
+        n, m = a_x.range, a_y.range
+
+        # the mode pair is formed in blocks of rows that fit into the memory budget; energy_of_mode_pair couples each row
+        # of b to the next row of a, so every block but the last contains the next row of a and a zero row of b
+        itemsize = np.result_type(a_x.data, a_y.data, b_x.data, b_y.data).itemsize
+        step = _chunk_size(n.size, 8 * m.size * itemsize, 0, "mera2d.energy")
+        e = 0
+        for i in range(0, n.size, step):
+            rows = slice(i, i + step + 1)
+            a = np.outer(a_x.data[rows], a_y.data)
+            b = np.outer(b_x.data[rows], b_y.data)
+            if i + step < n.size:
+                b[-1] = 0
+            e += mera2d.energy_of_mode_pair(n[rows], m, a, b)
+        return e / 2 ** (level_x + level_y + 1)
+
+    def correlation(
+        self, dx, dy, levels_x, levels_y, x=0, y=0, executor=None, n_jobs=None
+    ):
+        """
+        Compute correlation function C((x, y), (x + dx, y + dy)) of approximate ground state with given numbers of MERA
+        layers for all pairs of displacements in the arrays dx and dy (the result has shape (len(dx), len(dy))).
+
+        The sites of the original lattice are labeled by (X, Y) with X = Y mod 2, where (2n, 2m) and (2n+1, 2m+1) carry
+        the mode pair entries a[n, m] / sqrt(2) and b[n, m] / sqrt(2), respectively (cf. energy_of_mode_pair). The
+        correlation function is nan for displacements with dx != dy mod 2, which do not connect two sites.
+
+        The mode pairs are products of 1D modes, so the sum over level pairs factorizes into the product of two 1D
+        correlation functions (see mera1d.correlation), up to the staggering signs of the 1D eigenmodes.
+        """
+        assert (x - y) % 2 == 0, "(x, y) should be a site of the lattice"
+        return _separable_correlation(
+            self.mera1d, [dx, dy], [levels_x, levels_y], [x, y], executor, n_jobs
+        )
+
+    def iter_energy(self, max_levels=None):
+        """
+        Iterate over triples (levels, E, delta), where E is the energy with levels MERA layers in either direction and
+        delta is the absolute value of the contribution of the level pairs added last.
+        """
+        E = 0
+        for levels in itertools.islice(itertools.count(1), max_levels):
+            pairs = [(levels, level) for level in range(1, levels + 1)]
+            pairs += [(level, levels) for level in range(1, levels)]
+            delta = np.sum([self._energy_of_level_pair(pair) for pair in pairs])
+            E += delta
+            yield levels, E, abs(delta)
+
+    def energy_adaptive(self, tol, max_levels=20):
+        """
+        Compute energy with as many MERA layers (in either direction) as needed for contributions to drop below tol;
+        return (E, levels).
+        """
+        return _converge(self.iter_energy(max_levels), tol, max_levels)
+
+
+class mera3d:
+    """
+    3D Gaussian MERA for approximate ground state of free-fermion Hamiltonian at half filling.
+
+    The sites of the lattice are labeled by (X, Y, Z) with X = Y = Z mod 2, i.e. they form a body-centered cubic lattice
+    with sublattices (2n, 2m, 2k) and (2n+1, 2m+1, 2k+1). Like for mera2d, the mode pairs (a, b) of the branching MERA
+    are tensor products of 1D eigenmode pairs, and the Hamiltonian couples each site to its eight nearest neighbors
+    with the tensor product of the couplings of the 1D chain (see energy_of_mode_pair). Energies and correlation
+    functions are computed from 1D quantities, so no 3D arrays are formed.
+    """
+
+    def __init__(self, h, g, dtype=None):
+        """The wavelet instances h, g should form an approximate Hilbert pair (see mera1d for dtype)."""
+        self.mera1d = mera1d(h, g, dtype)
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_shared(self, protocol)
+
+    @staticmethod
+    def selesnick(K, L):
+        return mera3d(*selesnick_hwlet(K, L))
+
+    def eigenmode_pairs(self, level_x, level_y, level_z, x=0, y=0, z=0):
+        """
+        Return the 1D eigenmode pairs [(a_x, b_x), (a_y, b_y), (a_z, b_z)] (see mera1d.eigenmode_pair) whose tensor
+        products a = a_x (x) a_y (x) a_z and b = b_x (x) b_y (x) b_z form the approximate (negative-energy) eigenmode
+        pair on the even/odd sublattices at the given levels and site (x, y, z).
+        """
+        assert level_x >= 1 and level_y >= 1 and level_z >= 1
+        return [
+            self.mera1d.eigenmode_pair(level, n)
+            for level, n in [(level_x, x), (level_y, y), (level_z, z)]
+        ]
+
+    @staticmethod
+    def energy_of_mode_pair(pairs):
+        """
+        Compute energy of the single-particle mode pair given by the 1D eigenmode pairs (see eigenmode_pairs).
+
+        The amplitudes are a / sqrt(2) and b / sqrt(2) on the two sublattices, and the Hamiltonian couples b to a by the
+        tensor product of the 1D couplings 1 - S^*, where S shifts by one sublattice site (in 1D, this is the hopping
+        Hamiltonian of mera1d.energy_of_mode; in 2D, it is the Hamiltonian of mera2d.energy_of_mode_pair). Hence the
+        energy is -Re prod(u), where u = <a, b> - <S a, b> is computed for each direction.
+        """
+        u = 1
+        for a, b in pairs:
+            u = u * _coupling(a, b)
+        return -np.real(u)
+
+    def energy(
+        self, levels_x, levels_y, levels_z, executor=None, n_jobs=None, method="real"
+    ):
+        """
+        Compute energy of approximate ground state with branching MERA truncated at given numbers of layers.
+
+        The energy of each level triple factorizes into 1D overlaps (see energy_of_mode_pair), so the cost is linear in
+        the support of the 1D eigenmodes and in the number of level triples. If method is "real", the overlaps are
+        computed in real space, in parallel over the levels (see utils.parallel_map). If method is "spectral", they are
+        computed in momentum space (see mera2d.energy).
+        """
+        assert method in ["real", "spectral"]
+        levels = max(levels_x, levels_y, levels_z)
+        if method == "spectral":
+            s, t = self.mera1d._pair_overlaps(levels)
+            u = s - t.conj()
+        else:
+            u = np.array(
+                parallel_map(
+                    self._coupling_of_level, range(1, levels + 1), executor, n_jobs
+                )
+            )
+        return _separable_energy([u[:levels_x], u[:levels_y], u[:levels_z]])
+
+    def _coupling_of_level(self, level):
+        return _coupling(*self.mera1d.eigenmode_pair(level))
+
+    def correlation(
+        self,
+        dx,
+        dy,
+        dz,
+        levels_x,
+        levels_y,
+        levels_z,
+        x=0,
+        y=0,
+        z=0,
+        executor=None,
+        n_jobs=None,
+    ):
+        """
+        Compute correlation function C((x, y, z), (x + dx, y + dy, z + dz)) of approximate ground state with given
+        numbers of MERA layers for all triples of displacements in the arrays dx, dy and dz (the result has shape
+        (len(dx), len(dy), len(dz))). The correlation function is nan for displacements that do not connect two sites.
+
+        As for mera2d.correlation, the sum over level triples factorizes into the product of three 1D correlation
+        functions, up to the staggering signs of the 1D eigenmodes.
+        """
+        assert (x - y) % 2 == 0 and (
+            x - z
+        ) % 2 == 0, "(x, y, z) should be a site of the lattice"
+        return _separable_correlation(
+            self.mera1d,
+            [dx, dy, dz],
+            [levels_x, levels_y, levels_z],
+            [x, y, z],
+            executor,
+            n_jobs,
+        )
+
+    def iter_energy(self, max_levels=None):
+        """
+        Iterate over triples (levels, E, delta), where E is the energy with levels MERA layers in every direction and
+        delta is the absolute value of the contribution of the level triples added last.
+        """
+        E, u = 0, []
+        for levels in itertools.islice(itertools.count(1), max_levels):
+            u.append(self._coupling_of_level(levels))
+            E_new = _separable_energy([np.array(u)] * 3)
+            delta, E = E_new - E, E_new
+            yield levels, E, abs(delta)
+
+    def energy_adaptive(self, tol, max_levels=20):
+        """
+        Compute energy with as many MERA layers (in every direction) as needed for contributions to drop below tol;
+        return (E, levels).
+        """
+        return _converge(self.iter_energy(max_levels), tol, max_levels)
+
+
+def _coupling(a, b):
+    """Return <a, b> - <S a, b> for 1D eigenmode pair (a, b), where S shifts by one site (see mera3d)."""
+    assert np.allclose(a.range, b.range)
+    a, b = a.data, b.data
+    return np.vdot(a, b) - np.vdot(a[1:], b[:-1])
+
+
+def _separable_energy(us):
+    """
+    Return energy of branching MERA whose mode pairs are tensor products of 1D eigenmode pairs, given for each direction
+    the array of 1D overlaps u = <a, b> - <S a, b> for levels 1, 2, ... (see mera3d.energy_of_mode_pair). The mode pairs
+    of level tuple (l_1, ..., l_d) contribute -Re(u_1 ... u_d) / 2^(l_1 + ... + l_d + 1) per site.
+    """
+    E = np.ones(())
+    for u in us:
+        E = np.multiply.outer(E, u / 2.0 ** np.arange(1, len(u) + 1))
+    return -np.sum(np.real(E)) / 2
+
+
+def _separable_correlation(m, ds, levels, xs, executor=None, n_jobs=None):
+    """
+    Return correlation function of branching MERA whose mode pairs are tensor products of eigenmode pairs of the 1D MERA
+    m, for all tuples of displacements in the arrays ds (one per direction), with the given numbers of layers and
+    starting site. Displacements that do not connect two sites (i.e., that differ mod 2) give nan.
+    """
+    C = np.full((), 2.0 ** (len(ds) - 1))
+    for d, level, x in zip(ds, levels, xs):
+        d = np.asarray(d)
+        C_1d = m.correlation(d, level, np.array([x]), executor, n_jobs)[0]
+
+        # the 1D eigenmodes are modulated by (-1)^n on both sublattices (see mera1d.eigenmode)
+        sign = (-1) ** ((x // 2 + (x + d) // 2) % 2)
+        C = np.multiply.outer(C, sign * C_1d)
+    parity = functools.reduce(np.add.outer, [np.asarray(d) % 2 for d in ds])
+    C[(parity != 0) & (parity != len(ds))] = np.nan
+    return C
+
+
+class bosonic_mera:
+    """1D Gaussian bosonic MERA for approximate ground state of the massless harmonic chain."""
+
+    def __init__(self, w, dtype=None):
+        """
+        The biorthogonal wavelet w should implement the phase relation of the harmonic chain (see
+        hilbert.massless_harmonic_biorth_wlet). Its channels 0 and 1 are used for the momenta and positions. If dtype is
+        given, it is used for cascades and covariance matrices instead of the package-wide utils.compute_dtype.
+        """
+        self.w = w
+        self.dtype = dtype
+
+    def __reduce_ex__(self, protocol):
+        return _reduce_shared(self, protocol)
+
+    @staticmethod
+    def selesnick(K, L):
+        return bosonic_mera(massless_harmonic_biorth_wlet(K, L))
+
+    def _channel(self, kind):
+        """Return channel of w used for momenta (kind="p") or positions (kind="q") and the rescaling factor."""
+        assert kind in ["p", "q"]
+        dtype = np.dtype(self.dtype) if self.dtype is not None else get_compute_dtype()
+        w = self.w.channel({"p": 0, "q": 1}[kind]).astype(dtype)
+        return w, math.sqrt(2) if kind == "q" else 1 / math.sqrt(2)
+
+    def _iter_coefficients(self, sites, levels, kind):
+        """
+        Iterate over triples (level, rows, offsets), where rows[i, m - offsets[i]] is the m-th wavelet coefficient of the
+        given level of the unit signal at sites[i], for level = 1, ..., levels, followed by the scaling coefficients of
+        the last level. The scaling coefficients are rescaled by 1/sqrt(2) for the momenta and by sqrt(2) for the
+        positions at every level. The coefficients of all sites are computed at once and their supports have bounded
+        size, independent of the level.
+        """
+        w, alpha = self._channel(kind)
+        rows = np.ones((len(sites), 1), dtype=w.scaling_filter.data.dtype)
+        offsets = np.asarray(sites)
+        for level in range(1, levels + 1):
+            yield (level,) + _analyze_windows(rows, offsets, w.wavelet_filter)
+            rows, offsets = _analyze_windows(rows, offsets, w.scaling_filter)
+            rows *= alpha
+        yield levels, rows, offsets
+
+    def _iter_autocorrelations(self, levels, kind):
+        """
+        Iterate over pairs (level, r), where r[k] = sum_n psi[n] psi[n + k] for |k| < len(w.scaling_filter) and psi is
+        the synthesis mode whose translates by 2^level yield the wavelet coefficients of the given level, followed by
+        the scaling coefficients of the last level (cf. _iter_coefficients).
+
+        Since psi_{l+1} = alpha (upsample(psi_l) * f), its autocorrelation satisfies r_{l+1} = alpha^2 (upsample(r_l) *
+        R_f), where R_f is the autocorrelation of f, so only a bounded window of lags needs to be propagated.
+        """
+        w, alpha = self._channel(kind)
+        W = len(w.scaling_filter.data)
+
+        def autocorrelation(f):
+            return f.convolve(f.reverse().conj())
+
+        def window(r):
+            return signal([r[k] for k in range(-W, W + 1)], -W)
+
+        R_s = autocorrelation(w.scaling_filter)
+        for scaling in [False, True]:
+            r = window(alpha**2 * R_s if scaling else autocorrelation(w.wavelet_filter))
+            for level in range(1, levels + 1):
+                if level > 1:
+                    r = window(alpha**2 * r.upsample().convolve(R_s))
+                if not scaling or level == levels:
+                    yield level, r
+
+    def two_point(self, x, y, levels, kind="p", regulate=False):
+        """
+        Return two-point function <p_x p_y> (kind="p") or <q_x q_y> (kind="q") of approximate ground state with levels
+        MERA layers for arbitrary (broadcastable) integer arrays of sites x and y. If regulate is True, <q_x q_x> is
+        subtracted (the position correlations are infrared divergent).
+
+        The wavelet coefficients of the unit signals at all sites are computed at once, level by level (see
+        _iter_coefficients), so the cost is linear in the number of levels.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x), np.asarray(y))
+        sites, index = np.unique(np.r_[x.ravel(), y.ravel()], return_inverse=True)
+        i, j = index[: x.size], index[x.size :]
+        C = 0
+        for _, rows, offsets in self._iter_coefficients(sites, levels, kind):
+            C = C + _windows_two_point(rows, offsets, i, j) / 2
+            if regulate:
+                C -= _windows_two_point(rows, offsets, i, i) / 2
+        return C.reshape(x.shape)
+
+    def p_covariance(self, stop, levels, start=0):
+        """Return covariance matrix <p_i p_j> of subsystem {start,...,stop-1}."""
+        x = np.arange(start, stop)
+        return self.two_point(x[:, np.newaxis], x[np.newaxis, :], levels, "p")
+
+    def q_covariance(self, stop, levels, start=0, regulate=True):
+        """Return (regulated) covariance matrix <q_i q_j> of subsystem {start,...,stop-1} (see two_point)."""
+        x = np.arange(start, stop)
+        return self.two_point(x[:, np.newaxis], x[np.newaxis, :], levels, "q", regulate)
+
+    def energy(self, levels):
+        """
+        Compute energy density <p_0^2> / 2 + <(q_0 - q_1)^2> / 8, averaged over sites, of approximate ground state with
+        levels MERA layers (the exact value is 1/pi).
+        """
+        E = 0
+        for (level, r_p), (_, r_q) in zip(
+            self._iter_autocorrelations(levels, "p"),
+            self._iter_autocorrelations(levels, "q"),
+        ):
+            # each mode psi contributes sum_n psi[n] psi[n + k] / 2^level to the site average of <p_x p_{x+k}>
+            E_p = r_p[0] / 4
+            E_q = (r_q[0] - r_q[1]) / 8
+            E += np.real(E_p + E_q) / 2**level
+        return E
@@ -0,0 +1,94 @@
+import functools
+import numpy as np
+from .utils import *
+from .signal import *
+from .wavelets import *
+from .lattice import _polyphase, _polyphase_jacobian
+from .hilbert import *
+from .mera import *
+
+__all__ = ["optimize_hwlet"]
+
+
+def optimize_hwlet(
+    length,
+    objective="energy",
+    levels=10,
+    offset=0,
+    num_starts=8,
+    seed=None,
+    maxiter=500,
+    executor=None,
+    n_jobs=None,
+):
+    """
+    Return an optimized Hilbert transform wavelet pair (h, g) whose scaling filters have the given (even) length.
+
+    The scaling filters are parameterized by the angles of paraunitary lattices (see lattice.paraunitary_lattice), so
+    they are orthogonal by construction, and the angles sum to pi/4 so that the scaling filters sum to sqrt(2). The
+    scaling filter of h starts at 0 and that of g at offset. The objective is minimized by L-BFGS and can be one of
+
+    * "energy": energy of mera1d(h, g) with the given number of levels (see mera1d.energy_gradient)
+    * "phase_error": L2 phase error of the pair (see hilbert.phase_error_gradient)
+    * a function (h, g) -> (value, grad_h, grad_g) with gradients with respect to the scaling filters
+
+    The optimization is started from num_starts random angles (drawn using seed) and the best result is returned. The
+    starts are run in parallel (see utils.parallel_map).
+    """
+    assert length >= 4 and length % 2 == 0, "length should be even and at least 4"
+    if objective == "energy":
+        objective = functools.partial(_energy_objective, levels=levels)
+    elif objective == "phase_error":
+        objective = phase_error_gradient
+
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform(-np.pi, np.pi, (num_starts, length - 2))
+    f = functools.partial(
+        _minimize, objective=objective, offset=offset, maxiter=maxiter
+    )
+    results = parallel_map(f, starts, executor, n_jobs)
+    best = min(results, key=lambda result: result.fun)
+    n = length // 2
+    return _hwlet(best.x[: n - 1], best.x[n - 1 :], offset)
+
+
+def _energy_objective(h, g, levels):
+    return mera1d(h, g).energy_gradient(levels)
+
+
+def _minimize(x0, objective, offset, maxiter):
+    import scipy.optimize
+
+    def f(x):
+        h, g, J_h, J_g = _hwlet(x[: len(x) // 2], x[len(x) // 2 :], offset, True)
+        value, grad_h, grad_g = objective(h, g)
+        assert np.array_equal(grad_h.range, h.scaling_filter.range) and np.array_equal(
+            grad_g.range, g.scaling_filter.range
+        ), "Gradients should be defined on the index ranges of the scaling filters."
+        return value, np.r_[J_h @ grad_h.data, J_g @ grad_g.data]
+
+    return scipy.optimize.minimize(
+        f, x0, jac=True, method="L-BFGS-B", options={"maxiter": maxiter}
+    )
+
+
+def _hwlet(phi_h, phi_g, offset, jacobian=False):
+    """Return the pair (h, g) with scaling filters given by _scaling_filter(phi_h) and _scaling_filter(phi_g)."""
+    h_s, J_h = _scaling_filter(phi_h)
+    g_s, J_g = _scaling_filter(phi_g)
+    h = orthogonal_wavelet.from_scaling_filter(signal(h_s))
+    g = orthogonal_wavelet.from_scaling_filter(signal(g_s, offset))
+    if jacobian:
+        return h, g, J_h, J_g
+    return h, g
+
+
+def _scaling_filter(phi):
+    """
+    Return scaling filter of the lattice with angles (phi, pi/4 - sum(phi)) and its derivatives with respect to phi.
+    """
+    angles = np.r_[phi, np.pi / 4 - np.sum(phi)]
+    M = _polyphase(angles)
+    J = _polyphase_jacobian(angles)
+    J = J[:-1] - J[-1]
+    return M[:, :, 0].ravel(), J[:, :, :, 0].reshape(len(phi), -1)
@@ -14,6 +14,18 @@ class signal:
         #: Signal data.
         self.data = np.array(data if data is not None else [])
 
+    @staticmethod
+    def zeros(start, stop, dtype=float):
+        """Return zero signal defined for start <= n < stop."""
+        return signal._wrap(np.zeros(stop - start, dtype=dtype), start)
+
+    @staticmethod
+    def _wrap(data, start=0):
+        """Return signal with the given data array (unlike the constructor, the array is not copied)."""
+        s = signal(start=start)
+        s.data = data
+        return s
+
     @property
     def stop(self):
         """Index after last index where the signal is defined."""
@@ -48,10 +60,35 @@ class signal:
         """Return complex conjugate of signal."""
         return signal(self.data.conj(), self.start)
 
+    def astype(self, dtype):
+        """Return signal with data converted to the given dtype."""
+        return signal(self.data.astype(dtype), self.start)
+
     def norm(self):
         """Return l^2 norm of signal."""
         return np.linalg.norm(self.data)
 
+    def trim(self, tol):
+        """
+        Return (s, error), where s is the signal with as many leading and trailing coefficients removed as possible such
+        that the l^2 norm error = ||self - s|| of the removed coefficients is at most tol. At least one coefficient is
+        kept, and the data of s is a view into that of self.
+        """
+        n = self.data.size
+        if n <= 1:
+            return self, 0.0
+        left = _tail_masses(self.data, tol)
+        right = _tail_masses(self.data[::-1], tol)
+
+        # for each number i of leading coefficients, remove as many trailing coefficients j as the budget allows
+        i = np.arange(np.searchsorted(left, tol**2, side="right"))
+        j = np.searchsorted(right, tol**2 - left[i], side="right") - 1
+        j = np.minimum(j, n - 1 - i)
+        k = np.argmax(i + j)
+        i, j = i[k], j[k]
+        error = np.sqrt(left[i] + right[j])
+        return signal._wrap(self.data[i : n - j], self.start + i), error
+
     def isclose(self, other, **kwargs):
         """Determine whether signals are close. All keyword arguments are forwarded to numpy.allclose."""
         start, stop, a, b = self._union_align(other)
@@ -59,13 +96,34 @@ class signal:
 
     def __add__(self, other):
         """Add two signals."""
-        start, stop, a, b = self._union_align(other)
-        return signal(a + b, start)
+        return self._union_copy(other).accumulate(other)
 
     def __sub__(self, other):
         """Subtract two symbols."""
-        start, stop, a, b = self._union_align(other)
-        return signal(a - b, start)
+        return self._union_copy(other).accumulate(other, -1)
+
+    def __iadd__(self, other):
+        """Add signal in place."""
+        return self.accumulate(other)
+
+    def __isub__(self, other):
+        """Subtract signal in place."""
+        return self.accumulate(other, -1)
+
+    def accumulate(self, other, alpha=1):
+        """
+        Add alpha * other to the signal in place and return it. The data is only reallocated if the support or the dtype
+        of other requires it.
+        """
+        self._reserve(other.start, other.stop, np.result_type(other.data, alpha))
+        target = self.data[other.start - self.start : other.stop - self.start]
+        if alpha == 1:
+            target += other.data
+        elif alpha == -1:
+            target -= other.data
+        else:
+            target += alpha * other.data
+        return self
 
     def __mul__(self, other):
         """Scalar multiplication."""
@@ -107,8 +165,9 @@ class signal:
 
     def modulate(self, z):
         """Return modulated signal s[n] = self[n] * z^n (z should be complex if n can be negative)."""
-        data = np.multiply(self.data, z ** np.array(self.range))
-        return signal(data, self.start)
+        dtype = np.result_type(self.data, z)
+        data = np.multiply(self.data, z ** np.array(self.range), dtype=dtype)
+        return signal._wrap(data, self.start)
 
     def reverse(self):
         """Return reversed signal s[n] = self[-n]."""
@@ -126,24 +185,34 @@ class signal:
     def upsample(self):
         """Return upsampled signal, s[2n] = self[n]."""
         if self.data.size == 0:
-            return signal()
+            return signal(self.data)
         start = self.start * 2
         data = np.zeros(2 * self.data.size - 1, dtype=self.data.dtype)
         data[::2] = self.data
-        return signal(data, start)
+        return signal._wrap(data, start)
 
     def convolve(self, other):
         """Return convolution of self and other."""
         if self.data.size == 0 or other.data.size == 0:
-            return signal()
+            return signal(np.zeros(0, dtype=np.result_type(self.data, other.data)))
         data = np.convolve(self.data, other.data)
         start = self.start + other.start
-        return signal(data, start)
+        return signal._wrap(data, start)
 
     def ft(self, omega):
         """Return periodic Fourier transform (see utils.dtft)."""
         return dtft(self.range, self.data, omega)
 
+    def periodize(self, N):
+        """Return array with entries sum_m self[n + m N] for n = 0, ..., N-1."""
+        data = np.zeros(N, dtype=self.data.dtype)
+        np.add.at(data, self.range % N, self.data)
+        return data
+
+    def fft(self, N):
+        """Return Fourier transform at the momenta 2 pi n / N for n = 0, ..., N-1 (computed by FFT)."""
+        return np.fft.fft(self.periodize(N))
+
     def _intersect_align(self, other):
         start = max(self.start, other.start)
         stop = min(self.stop, other.stop)
@@ -157,10 +226,39 @@ class signal:
         start = min(self.start, other.start)
         stop = max(self.stop, other.stop)
 
-        # pad by zeros
-        a = np.zeros(stop - start, dtype=self.data.dtype)
-        b = np.zeros(stop - start, dtype=other.data.dtype)
+        # pad by zeros (using a single buffer)
+        a, b = np.zeros((2, stop - start), dtype=np.result_type(self.data, other.data))
         a[self.start - start : self.stop - start] = self.data
         b[other.start - start : other.stop - start] = other.data
 
         return start, stop, a, b
+
+    def _union_copy(self, other):
+        """Return copy of self, padded by zeros to the union of the supports of self and other."""
+        start = min(self.start, other.start)
+        stop = max(self.stop, other.stop)
+        s = signal.zeros(start, stop, np.result_type(self.data, other.data))
+        s.data[self.start - start : self.stop - start] = self.data
+        return s
+
+    def _reserve(self, start, stop, dtype):
+        """Enlarge support and promote dtype in place so that data with the given support and dtype can be added."""
+        start, stop = min(self.start, start), max(self.stop, stop)
+        dtype = np.result_type(self.data, dtype)
+        if (start, stop) != (self.start, self.stop) or dtype != self.data.dtype:
+            data = np.zeros(stop - start, dtype=dtype)
+            data[self.start - start : self.stop - start] = self.data
+            self.start, self.data = start, data
+
+
+def _tail_masses(data, tol):
+    """
+    Return the cumulative sums of |data|^2 (starting with 0) over a prefix that is long enough to exceed tol^2. Only the
+    prefix is inspected, so trimming long signals with short tails is cheap.
+    """
+    k = 64
+    while True:
+        masses = np.concatenate([[0], np.cumsum(np.abs(data[:k]) ** 2)])
+        if k >= data.size or masses[-1] > tol**2:
+            return masses
+        k *= 4
@@ -0,0 +1,344 @@
+import json
+import numpy as np
+from .signal import *
+from .wavelets import *
+
+__all__ = [
+    "save",
+    "load",
+    "to_bytes",
+    "from_bytes",
+    "share",
+    "shared_array",
+    "attach",
+    "shared_handle",
+]
+
+# layout of the flat buffer: magic, header length (8 bytes, little endian), JSON header describing the object and the
+# arrays, padding, and the raw array data (each array aligned to _ALIGN bytes)
+_MAGIC = b"PYFM"
+_ALIGN = 64
+
+
+def save(file, obj):
+    """
+    Save signal, orthogonal_wavelet, biorthogonal_wavelet, MERA or array to an .npz file. For mera1d, mera2d and
+    mera3d, the cached eigenmode tables are saved as well.
+    """
+    arrays = []
+    meta = _encode(obj, arrays)
+    np.savez(
+        file,
+        meta=np.array(json.dumps(meta)),
+        **{"array_%d" % i: a for i, a in enumerate(arrays)},
+    )
+
+
+def load(file):
+    """Load object saved by save."""
+    with np.load(file) as f:
+        meta = json.loads(str(f["meta"]))
+        arrays = [f["array_%d" % i] for i in range(len(f.files) - 1)]
+    return _decode(meta, arrays)
+
+
+def to_bytes(obj):
+    """Return object (see save) as a flat binary buffer."""
+    arrays = []
+    meta = _encode(obj, arrays)
+    header, size = _layout(meta, [(a.dtype, a.shape) for a in arrays])
+    buffer = bytearray(size)
+    _write_header(buffer, header)
+    for a, view in zip(arrays, _views(buffer, header)):
+        view[...] = a
+    return bytes(buffer)
+
+
+def from_bytes(buffer):
+    """
+    Return object stored in the given buffer (see to_bytes). The arrays of the object are views into the buffer, so
+    nothing is copied.
+    """
+    header = _header(buffer)
+    return _decode(header["object"], _views(buffer, header))
+
+
+class shared_handle:
+    """
+    Handle to an object or array placed in shared memory by share or shared_array. Handles are small and can be pickled
+    cheaply to other processes, which obtain the object using attach.
+    """
+
+    def __init__(self, name, size):
+        #: Name of the shared memory segment.
+        self.name = name
+
+        #: Size of the shared memory segment in bytes.
+        self.size = size
+
+    def __repr__(self):
+        return "shared_handle(%r, %d)" % (self.name, self.size)
+
+    def __eq__(self, other):
+        return isinstance(other, shared_handle) and self.name == other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def unlink(self):
+        """Remove the shared memory segment. Processes that have attached the object can continue to use it."""
+        shm, _ = _attached.pop(self.name, (None, None))
+        if shm is None:
+            shm = _open(self.name)
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # arrays of the attached object are still alive; the mapping is closed when they are garbage collected
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink()
+
+
+def share(obj, levels=None):
+    """
+    Place object (see save) in shared memory and return its shared_handle. For mera1d, mera2d and mera3d, the eigenmode
+    tables of levels 1, ..., levels are computed first so that they are shared as well.
+
+    Objects obtained by attach are pickled as their handle, so they can be passed to process pools (e.g. via the
+    executor arguments of mera1d) without copying filters and tables to every task. The segment should be removed by
+    shared_handle.unlink once it is no longer needed (or by using the handle as a context manager).
+    """
+    from .mera import mera1d, mera2d, mera3d
+
+    if levels is not None:
+        m = obj.mera1d if isinstance(obj, (mera2d, mera3d)) else obj
+        if not isinstance(m, mera1d):
+            raise TypeError(
+                "Objects of type %s have no eigenmode tables to share."
+                % type(obj).__name__
+            )
+        for level in range(1, levels + 1):
+            m._correlation_table(level)
+    arrays = []
+    meta = _encode(obj, arrays)
+    handle, views = _create(meta, [(a.dtype, a.shape) for a in arrays])
+    for a, view in zip(arrays, views):
+        view[...] = a
+    return handle
+
+
+def shared_array(shape, dtype=float):
+    """
+    Return shared_handle of a zero-initialized array in shared memory. Worker processes can write into the array
+    obtained by attach, e.g. by passing the handle as the out argument of mera1d.covariance.
+    """
+    handle, (view,) = _create(
+        {"type": "ndarray", "data": 0}, [(np.dtype(dtype), tuple(shape))]
+    )
+    view[...] = 0
+    return handle
+
+
+def attach(handle):
+    """
+    Return object or array in shared memory described by the given shared_handle. The arrays are views into the shared
+    memory segment. Repeated calls in the same process return the same object, so caches are shared between tasks.
+    """
+    if handle.name not in _attached:
+        shm = _open(handle.name)
+        header = _header(shm.buf)
+        obj = _decode(header["object"], _views(shm.buf, header), handle)
+        _attached[handle.name] = shm, obj
+    return _attached[handle.name][1]
+
+
+# shared memory segments opened by this process, and the corresponding objects
+_attached = {}
+
+
+def _open(name):
+    from multiprocessing import shared_memory
+
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # Python < 3.13
+        return shared_memory.SharedMemory(name)
+
+
+def _create(meta, specs):
+    """
+    Create shared memory segment for the object described by meta, whose arrays have the given (dtype, shape), and
+    return its handle and views of the arrays.
+    """
+    from multiprocessing import shared_memory
+
+    header, size = _layout(meta, specs)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    _write_header(shm.buf, header)
+    views = _views(shm.buf, header)
+    handle = shared_handle(shm.name, size)
+    _attached[shm.name] = shm, _decode(meta, views, handle)
+    return handle, views
+
+
+def _encode(obj, arrays):
+    """Return JSON-serializable description of obj, appending its arrays to the given list."""
+
+    def array(a):
+        arrays.append(np.asarray(a))
+        return len(arrays) - 1
+
+    def dtype(d):
+        return None if d is None else np.dtype(d).str
+
+    from .mera import mera1d, periodic_mera1d, mera2d, mera3d, bosonic_mera
+
+    if isinstance(obj, np.ndarray):
+        return {"type": "ndarray", "data": array(obj)}
+    if isinstance(obj, signal):
+        return {"type": "signal", "start": int(obj.start), "data": array(obj.data)}
+    if isinstance(obj, orthogonal_wavelet):
+        return {
+            "type": "orthogonal_wavelet",
+            "scaling_filter": _encode(obj.scaling_filter, arrays),
+            "wavelet_filter": _encode(obj.wavelet_filter, arrays),
+        }
+    if isinstance(obj, biorthogonal_wavelet):
+        return {
+            "type": "biorthogonal_wavelet",
+            "scaling_filters": [_encode(f, arrays) for f in obj.scaling_filters],
+            "wavelet_filters": [_encode(f, arrays) for f in obj.wavelet_filters],
+        }
+    if isinstance(obj, mera1d):
+        return {
+            "type": "mera1d",
+            "h": _encode(obj.h, arrays),
+            "g": _encode(obj.g, arrays),
+            "dtype": dtype(obj.dtype),
+            "tables": [
+                [level, dtype(d), array(table), *tol]
+                for (level, d, *tol), table in obj._correlation_tables.items()
+            ],
+        }
+    if isinstance(obj, periodic_mera1d):
+        return {
+            "type": "periodic_mera1d",
+            "h": _encode(obj.h, arrays),
+            "g": _encode(obj.g, arrays),
+            "N": obj.N,
+            "dtype": dtype(obj.dtype),
+        }
+    if isinstance(obj, mera2d):
+        return {"type": "mera2d", "mera1d": _encode(obj.mera1d, arrays)}
+    if isinstance(obj, mera3d):
+        return {"type": "mera3d", "mera1d": _encode(obj.mera1d, arrays)}
+    if isinstance(obj, bosonic_mera):
+        return {
+            "type": "bosonic_mera",
+            "w": _encode(obj.w, arrays),
+            "dtype": dtype(obj.dtype),
+        }
+    raise TypeError("Cannot serialize object of type %s." % type(obj).__name__)
+
+
+def _decode(meta, arrays, handle=None):
+    """Return object described by _encode. If a handle is given, MERA objects are pickled as the handle."""
+    kind = meta["type"]
+    if kind == "ndarray":
+        return arrays[meta["data"]]
+    if kind == "signal":
+        return signal._wrap(arrays[meta["data"]], meta["start"])
+    if kind == "orthogonal_wavelet":
+        return orthogonal_wavelet(
+            _decode(meta["scaling_filter"], arrays),
+            _decode(meta["wavelet_filter"], arrays),
+        )
+    if kind == "biorthogonal_wavelet":
+        return biorthogonal_wavelet(
+            [_decode(f, arrays) for f in meta["scaling_filters"]],
+            [_decode(f, arrays) for f in meta["wavelet_filters"]],
+        )
+
+    from .mera import mera1d, periodic_mera1d, mera2d, mera3d, bosonic_mera
+
+    if kind == "mera1d":
+        obj = mera1d(
+            _decode(meta["h"], arrays), _decode(meta["g"], arrays), meta["dtype"]
+        )
+        for level, dtype, i, *tol in meta["tables"]:
+            obj._correlation_tables[(level, np.dtype(dtype), *tol)] = arrays[i]
+    elif kind == "periodic_mera1d":
+        obj = periodic_mera1d(
+            _decode(meta["h"], arrays),
+            _decode(meta["g"], arrays),
+            meta["N"],
+            meta["dtype"],
+        )
+    elif kind in ["mera2d", "mera3d"]:
+        cls = {"mera2d": mera2d, "mera3d": mera3d}[kind]
+        obj = cls.__new__(cls)
+        obj.mera1d = _decode(meta["mera1d"], arrays)
+    elif kind == "bosonic_mera":
+        obj = bosonic_mera(_decode(meta["w"], arrays), meta["dtype"])
+    else:
+        raise ValueError("Unknown object type %r." % kind)
+    obj._shared = handle
+    return obj
+
+
+def _reduce_shared(obj, protocol):
+    """Implementation of __reduce_ex__ for objects that can be attached from shared memory."""
+    handle = getattr(obj, "_shared", None)
+    if handle is not None:
+        return attach, (handle,)
+    return object.__reduce_ex__(obj, protocol)
+
+
+def _layout(meta, specs):
+    """Return header describing the layout of the flat buffer for arrays with the given (dtype, shape), and its size."""
+    arrays, offset = [], 0
+    for dtype, shape in specs:
+        arrays.append([offset, dtype.str, [int(n) for n in shape]])
+        nbytes = dtype.itemsize * int(np.prod(shape))
+        offset += -(-nbytes // _ALIGN) * _ALIGN
+    header = {"object": meta, "arrays": arrays}
+    return header, _data_start(header) + offset
+
+
+def _header_bytes(header):
+    return json.dumps(header).encode("utf-8")
+
+
+def _data_start(header):
+    n = len(_MAGIC) + 8 + len(_header_bytes(header))
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _write_header(buffer, header):
+    data = _header_bytes(header)
+    n = len(_MAGIC) + 8
+    buffer[:n] = _MAGIC + len(data).to_bytes(8, "little")
+    buffer[n : n + len(data)] = data
+
+
+def _header(buffer):
+    buffer = memoryview(buffer)
+    n = len(_MAGIC) + 8
+    assert bytes(buffer[: len(_MAGIC)]) == _MAGIC, "Not a pyfermions buffer."
+    length = int.from_bytes(buffer[len(_MAGIC) : n], "little")
+    return json.loads(bytes(buffer[n : n + length]).decode("utf-8"))
+
+
+def _views(buffer, header):
+    """Return arrays described by the header as views into the buffer."""
+    start = _data_start(header)
+    return [
+        np.ndarray(shape, np.dtype(dtype), buffer=buffer, offset=start + offset)
+        for offset, dtype, shape in header["arrays"]
+    ]
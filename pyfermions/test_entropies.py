@@ -0,0 +1,50 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .mera import *
+from .entropies import *
+
+
+def test_entropy_estimate():
+    m = mera1d.selesnick(2, 2)
+    C = m.covariance(200, 8)
+    for alpha in [1, 2]:
+        S = entropy(C, alpha)
+        for dense in [False, True]:
+            S_est, error = entropy_estimate(m, 200, 8, alpha, dense=dense, seed=1)
+            assert error < 1e-3
+            assert abs(S_est - S) < 5 * error + 1e-6
+
+    # subclasses of mera1d use the covariance operator as well
+    class sub(mera1d):
+        def covariance(self, *args, **kwargs):
+            raise AssertionError("covariance matrix should not be formed")
+
+    S_est, error = entropy_estimate(sub(m.h, m.g), 200, 8, seed=1)
+    assert abs(S_est - entropy(C)) < 5 * error + 1e-6
+
+    # by default, the levels are chosen as in covariance_adaptive
+    C, levels = m.covariance_adaptive(1e-3, 200)
+    S_est, error = entropy_estimate(m, 200, seed=1)
+    assert abs(S_est - entropy(C)) < 5 * error + 1e-6
+
+    # arbitrary regions and periodic chains use the covariance matrix
+    sites = np.r_[0:50, 100:150]
+    S = entropy(m.covariance(levels=8, sites=sites))
+    S_est, error = entropy_estimate(m, sites, 8, seed=2)
+    assert abs(S_est - S) < 5 * error + 1e-6
+    p = periodic_mera1d.selesnick(2, 2, 256)
+    S_est, error = entropy_estimate(p, 128, seed=3)
+    assert abs(S_est - entropy(p.covariance(128))) < 5 * error + 1e-6
+
+
+def test_trace_estimate():
+    rng = np.random.default_rng(0)
+    U = np.linalg.qr(rng.standard_normal((100, 100)))[0]
+    A = U @ np.diag(np.linspace(0, 1, 100)) @ U.T
+    kwargs = dict(f=np.exp, rank=10, tol=1e-3, seed=4)
+    estimate, error = trace_estimate(A, **kwargs)
+    assert abs(estimate - np.sum(np.exp(np.linspace(0, 1, 100)))) < 5 * error
+
+    # the random numbers do not depend on the parallelization
+    with ThreadPoolExecutor(3) as executor:
+        assert trace_estimate(A, executor=executor, **kwargs) == (estimate, error)
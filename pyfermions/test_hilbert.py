@@ -1,4 +1,7 @@
+import pytest
 import numpy as np
+from .signal import *
+from .wavelets import *
 from .hilbert import *
 
 
@@ -406,3 +409,74 @@ def test_hwlet_7_3_vs_matlab():
     assert h.scaling_filter.start == g.scaling_filter.start == 0
     assert np.allclose(h.scaling_filter.data, expected_h)
     assert np.allclose(g.scaling_filter.data, expected_g)
+
+
+def test_high_precision():
+    pytest.importorskip("mpmath")
+    assert np.allclose(allpass(1 / 2, 3, precision=30), [1, 5, 3, 1 / 7])
+
+    g = np.random.rand(20)
+    h = np.convolve(g, g[::-1])
+    g = sfact(h, precision=40)
+    assert np.allclose(h, np.convolve(g, g[::-1]))
+
+    h, g = selesnick_hwlet(7, 3)
+    h_mp, g_mp = selesnick_hwlet(7, 3, precision=40)
+    assert np.allclose(h.scaling_filter.data, h_mp.scaling_filter.data)
+    assert np.allclose(g.scaling_filter.data, g_mp.scaling_filter.data)
+
+    # orthogonality holds to double precision, and designs are cached
+    s = h_mp.scaling_filter.data
+    for k in range(len(s) // 2):
+        assert abs(np.dot(s[2 * k :], s[: len(s) - 2 * k]) - (k == 0)) < 1e-15
+    h_mp_2, _ = selesnick_hwlet(7, 3, precision=40)
+    assert np.array_equal(h_mp_2.scaling_filter.data, s)
+
+
+def test_hwlet_metrics():
+    pairs = [selesnick_hwlet(2, 3), evenbly_white_hwlet()]
+    metrics = hwlet_metrics(pairs)
+    k = -np.pi + 2 * np.pi * np.arange(1024) / 1024
+    for i, (h, g) in enumerate(pairs):
+        eps = np.max(
+            np.abs(h.scaling_filter.ft(k) - np.exp(1j * k / 2) * g.scaling_filter.ft(k))
+        )
+        B = max(
+            np.max(np.abs(h.scaling_function(15)[1])),
+            np.max(np.abs(g.scaling_function(15)[1])),
+        )
+        assert np.isclose(metrics["eps"][i], eps)
+        assert np.isclose(metrics["B"][i], B)
+
+    m = hwlet_metrics(pairs[0], rtol=1e-4)
+    assert m["B"] <= metrics["B"][0] and abs(m["B"] - metrics["B"][0]) < 1e-2
+    assert m["phase_error"] < m["eps"] < m["bound"]
+
+
+def test_phase_error_gradient():
+    h, g = selesnick_hwlet(2, 3)
+    err, grad_h, grad_g = phase_error_gradient(h, g)
+    k = np.linspace(-np.pi, np.pi, 10001)[:-1]
+    diff = h.scaling_filter.ft(k) - np.exp(1j * k / 2) * g.scaling_filter.ft(k)
+    assert np.isclose(err, np.mean(np.abs(diff) ** 2), rtol=1e-3)
+
+    # the phase error is quadratic in the filters
+    d = signal(np.random.randn(len(grad_h.data)) * 1e-4, grad_h.start)
+    h_d = orthogonal_wavelet(h.scaling_filter + d, h.wavelet_filter)
+    assert np.isclose(
+        phase_error_gradient(h_d, g)[0], err + grad_h.vdot(d) + d.norm() ** 2
+    )
+
+
+def test_biorth_wlet():
+    w = massless_harmonic_biorth_wlet(2, 4)
+    assert all(len(s.data) == 2 * (2 + 2 * 4) for s in w.scaling_filters)
+    k = np.linspace(-np.pi, np.pi, 1001)
+    G_s, H_s = (s.ft(k) for s in w.scaling_filters)
+    assert np.max(np.abs(H_s - np.cos(k / 2) * G_s)) < 1e-2
+
+    a, b = rational_phase_approximation(5, mass=0.5)
+    k = np.arange(-np.pi + 0.1, np.pi - 0.1, 0.01)
+    A, B = signal(a, -4).ft(k).real, signal(b, -4).ft(k).real
+    assert np.allclose(A / B, np.sqrt(0.25 + np.cos(k / 2) ** 2) / np.sqrt(1.25))
+    variational_harmonic_biorth_wlet(3, 5, mass=0.5)
@@ -0,0 +1,52 @@
+import subprocess, sys
+import pyfermions
+
+
+def run(code, *args):
+    return subprocess.run(
+        [sys.executable, *args, "-c", code], capture_output=True, text=True, check=True
+    )
+
+
+def test_import_does_not_load_scipy():
+    out = run(
+        "import sys, pyfermions; pyfermions.signal([1]); pyfermions.DAUBECHIES_D4; "
+        "print(sorted(m for m in sys.modules if m.startswith('scipy')))"
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_lazy_submodules():
+    out = run(
+        "import pyfermions; "
+        "print([pyfermions.hilbert.__name__, pyfermions.mera.__name__, pyfermions.optimize.__name__])"
+    )
+    assert out.stdout.strip() == str(
+        ["pyfermions.hilbert", "pyfermions.mera", "pyfermions.optimize"]
+    )
+    assert {"hilbert", "mera", "optimize"} <= set(dir(pyfermions))
+
+
+def test_lazy_names_match_submodules():
+    from . import hilbert, mera
+
+    for module in [hilbert, mera]:
+        for name in module.__all__:
+            assert pyfermions._LAZY[name] == module.__name__.split(".")[-1]
+            assert getattr(pyfermions, name) is getattr(module, name)
+    assert set(pyfermions._LAZY) <= set(pyfermions.__all__) <= set(dir(pyfermions))
+
+
+def test_import_time_benchmark():
+    """Importing pyfermions should be much cheaper than importing scipy.signal."""
+    out = run(
+        "import numpy; import pyfermions; import scipy.signal", "-X", "importtime"
+    )
+    cumulative = {}
+    for line in out.stderr.splitlines():
+        if line.count("|") != 2:
+            continue
+        _, us, name = line.split("|")
+        if us.strip().isdigit():
+            cumulative[name.strip()] = int(us)
+    assert cumulative["pyfermions"] < cumulative["scipy.signal"] / 2
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+from .signal import *
+from .wavelets import *
+from .hilbert import *
+from .lattice import *
+
+
+def test_round_trip():
+    for w in [DAUBECHIES_D4, *selesnick_hwlet(4, 2), *evenbly_white_hwlet()]:
+        lattice = paraunitary_lattice.from_wavelet(w)
+        assert len(lattice.angles) == len(w.scaling_filter.data) // 2
+        assert np.isclose(np.sum(lattice.angles) % (2 * np.pi), np.pi / 4)
+
+        # the angles (and the discrete data) determine the wavelet
+        lattice = paraunitary_lattice(
+            lattice.angles, lattice.sign, lattice.delays, lattice.parity
+        )
+        v = lattice.to_wavelet()
+        assert v.scaling_filter.isclose(w.scaling_filter)
+        assert v.wavelet_filter.isclose(w.wavelet_filter)
+
+
+def test_long_designs():
+    # double-precision designs of long filters are not paraunitary to the default atol, high-precision ones are
+    h, _ = selesnick_hwlet(8, 8)
+    with pytest.raises(AssertionError):
+        paraunitary_lattice.from_wavelet(h)
+    pytest.importorskip("mpmath")
+    h, _ = selesnick_hwlet(8, 8, precision=50)
+    v = paraunitary_lattice.from_wavelet(h).to_wavelet()
+    assert np.allclose(v.scaling_filter.data, h.scaling_filter.data, rtol=0, atol=1e-14)
+
+
+def test_transform():
+    h, g = selesnick_hwlet(3, 3)
+    lattice = paraunitary_lattice.from_wavelet(h)
+    a = signal(np.random.rand(50), start=7)
+    b = signal(np.random.rand(40), start=-3)
+    assert lattice.reconstruct(a, b).isclose(h.reconstruct(a, b))
+    assert lattice.reconstruct(scaling=a).isclose(h.reconstruct(scaling=a))
+
+    A, B = lattice.analyze(a)
+    A_expected, B_expected = h.analyze(a)
+    assert A.isclose(A_expected) and B.isclose(B_expected)
+    assert lattice.reconstruct(A, B).isclose(a)
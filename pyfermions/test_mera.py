@@ -0,0 +1,368 @@
+import itertools
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .signal import *
+from .wavelets import *
+from .hilbert import *
+from .mera import *
+from .utils import compute_dtype, get_compute_dtype, memory_budget
+
+
+def test_energy_1d():
+    E = mera1d.selesnick(3, 3).energy(10)
+    assert abs(E + 2 / np.pi) < 1e-3
+
+
+def test_energy_2d():
+    E = mera2d.selesnick(1, 1).energy(6, 6)
+    assert abs(E + 8 / np.pi**2) < 0.1
+
+    # the mode pairs are formed in blocks of rows if they do not fit into the memory budget
+    with memory_budget(10**5):
+        assert np.isclose(mera2d.selesnick(1, 1).energy(6, 6), E, rtol=1e-13)
+
+
+def test_correlation_1d():
+    dx = np.arange(10)
+    C = mera1d.selesnick(3, 3).correlation(dx, levels=10)
+    exact = np.r_[1 / 2, np.sin(np.pi / 2 * dx[1:]) / (np.pi * dx[1:])]
+    assert np.allclose(C[0], exact, atol=1e-2)
+
+
+def test_covariance_1d():
+    m = mera1d.selesnick(2, 2)
+    C = m.covariance(8, levels=6, start=-3)
+    assert np.allclose(C, C.T)
+    assert np.allclose(C[0], m.correlation(np.arange(11), 6, x=np.array([-3]))[0])
+
+
+def test_parallel_matches_serial():
+    m = mera1d.selesnick(2, 2)
+    assert m.energy(8, n_jobs=4) == m.energy(8)
+    with ThreadPoolExecutor(3) as executor:
+        assert np.array_equal(m.covariance(6, 5, executor=executor), m.covariance(6, 5))
+
+    m = mera2d.selesnick(1, 1)
+    assert m.energy(4, 3, n_jobs=-1) == m.energy(4, 3)
+
+
+def test_covariance_tiled(tmp_path):
+    m = mera1d.selesnick(1, 2)
+    C = m.covariance(13, 5, start=-4)
+
+    # write to in-memory array and to .npy file (restarting with remaining tiles)
+    out = np.zeros_like(C)
+    assert m.covariance(13, 5, start=-4, out=out, tile_size=5, n_jobs=2) is out
+    assert np.allclose(out, C)
+
+    filename = str(tmp_path / "cov.npy")
+    tiles = [(i, j) for i in range(4) for j in range(i, 4)]
+    m.covariance(13, 5, start=-4, out=filename, tile_size=5, tiles=tiles[:3])
+    out = m.covariance(13, 5, start=-4, out=filename, tile_size=5, tiles=tiles[3:])
+    assert isinstance(out, np.memmap)
+    assert np.allclose(out, C)
+    assert np.allclose(np.load(filename), C)
+
+    # stream tiles
+    D = np.full_like(C, np.nan)
+    for rows, cols, block in m.covariance_tiles(13, 5, start=-4, tile_size=4):
+        D[rows, cols] = block
+    assert np.allclose(D, C)
+
+
+def test_covariance_sites():
+    m = mera1d.selesnick(2, 2)
+    C = m.covariance(40, 6, start=-10)
+    sites = np.r_[-10:-5, 20:30, 3]
+    assert np.allclose(
+        m.covariance(levels=6, sites=sites), C[np.ix_(sites + 10, sites + 10)]
+    )
+
+    x = np.array([[-7], [4], [25]])
+    y = np.array([[0, 29, -10, 4]])
+    assert np.allclose(m.two_point(x, y, 6), C[x + 10, y + 10])
+
+
+def test_covariance_operator():
+    m = mera1d.selesnick(2, 3)
+    C = m.covariance(150, 9, start=-50)
+    op = m.covariance_operator(-50, 150, 9)
+    assert op.shape == C.shape
+    v = np.random.rand(200)
+    assert np.allclose(op @ v, C @ v)
+    v = np.random.rand(200) + 1j * np.random.rand(200)
+    assert np.allclose(op @ v, C @ v)
+
+
+def test_correlation_kspace():
+    m = mera1d.selesnick(2, 3)
+    x = np.array([0, 1, 5, -3, 17])
+    dx = np.arange(-300, 300, 7)
+    C = m.correlation(dx, 7, x=x)
+    assert np.allclose(m.correlation_kspace(dx, 7, x=x), C)
+    assert np.allclose(m.correlation_kspace(dx, 7, x=x, N=2**14), C)
+    assert np.allclose(m.correlation_kspace([10**6], 7), 0)
+
+    # complex filters give complex correlations
+    h, g = selesnick_hwlet(2, 3)
+    h = orthogonal_wavelet.from_scaling_filter(h.scaling_filter.modulate(np.exp(0.3j)))
+    m = mera1d(h, g)
+    C = m.correlation(dx, 5, x=x)
+    assert np.max(np.abs(C.imag)) > 0.01
+    assert np.allclose(m.correlation_kspace(dx, 5, x=x), C)
+
+
+def test_adaptive_levels():
+    m = mera1d.selesnick(2, 2)
+    E, levels = m.energy_adaptive(1e-5)
+    assert abs(E - m.energy(levels)) < 1e-12
+    assert abs(E - m.energy(14)) < 1e-5
+
+    dx = np.arange(-5, 20)
+    C, levels = m.correlation_adaptive(dx, 1e-3, x=np.array([0, 3]))
+    assert np.allclose(C, m.correlation(dx, levels, x=np.array([0, 3])))
+    assert np.max(np.abs(C - m.correlation(dx, 14, x=np.array([0, 3])))) < 1e-3
+
+    with pytest.warns(UserWarning):
+        m.covariance_adaptive(1e-8, 5, max_levels=3)
+    with pytest.raises(AssertionError, match="max_levels"):
+        m.energy_adaptive(1e-8, max_levels=None)
+
+    m = mera2d.selesnick(1, 1)
+    E, levels = m.energy_adaptive(1e-3)
+    assert np.isclose(E, m.energy(levels, levels))
+
+
+def test_dispersions():
+    m = mera1d.selesnick(2, 2)
+    k = np.linspace(-np.pi, np.pi, 51)
+    e_s, e_w = m.dispersions([0, 3, 1], k)
+    assert e_s.shape == e_w.shape == (3, 51)
+    assert np.allclose(e_s[0], np.abs(np.exp(1j * k) - 1))
+    assert np.all(np.isnan(e_w[0]))
+    for i, level in [(1, 3), (2, 1)]:
+        assert np.allclose(e_s[i], m.e_scaling(level, k))
+        assert np.allclose(e_w[i], m.e_wavelet(level, k))
+
+    # recursive definition
+    H, G = m.h.scaling_filter.ft, m.g.scaling_filter.ft
+    h_1 = (
+        G(k / 2).conj() * H(k / 2) * (np.exp(1j * k / 2) - 1)
+        + G(k / 2 + np.pi).conj()
+        * H(k / 2 + np.pi)
+        * (np.exp(1j * k / 2 + 1j * np.pi) - 1)
+    ) / 2
+    assert np.allclose(m.h_scaling(1, k)[1, 0], h_1)
+
+
+def test_spectrum_cache():
+    import pickle
+
+    m = mera1d.selesnick(1, 1)
+    m._spectra.max_bytes = 2**17
+    C = m.correlation_kspace(np.arange(4), 4, N=2**12)
+    assert 0 < m._spectra._bytes <= 2**17
+    m = pickle.loads(pickle.dumps(m))
+    assert np.array_equal(m.correlation_kspace(np.arange(4), 4, N=2**12), C)
+
+    # the frequency grids of the dispersions are not cached
+    m._spectra.clear()
+    m.e_scaling(5, np.linspace(0, 1, 100))
+    assert m._spectra._bytes == 0
+
+
+def test_single_precision():
+    m = mera1d.selesnick(3, 3)
+    E, C = m.energy(12), m.covariance(64, 12)
+    with compute_dtype(np.float32):
+        assert get_compute_dtype() == np.float32
+        E_32, C_32 = m.energy(12), m.covariance(64, 12)
+        assert m.eigenmode(5).data.dtype == C_32.dtype == np.float32
+    assert get_compute_dtype() == np.float64
+
+    # errors against double precision are about 1e-7
+    assert abs(E_32 - E) < 1e-6
+    assert np.abs(C_32 - C).max() < 1e-6
+
+    m_32 = mera1d(m.h, m.g, dtype=np.float32)
+    assert m_32.covariance(64, 12).dtype == np.float32
+    assert abs(m_32.energy(12) - E) < 1e-6
+
+    m = mera2d.selesnick(2, 2)
+    E = m.energy(5, 5)
+    with compute_dtype(np.float32):
+        assert abs(m.energy(5, 5) - E) < 1e-6
+
+
+def test_energy_gradient():
+    def energy(h_s, g_s):
+        h = orthogonal_wavelet.from_scaling_filter(h_s)
+        g = orthogonal_wavelet.from_scaling_filter(g_s)
+        return mera1d(h, g).energy(8)
+
+    # the filters of evenbly_white_hwlet cover different index ranges
+    for h, g in [selesnick_hwlet(2, 2), evenbly_white_hwlet()]:
+        E, grad_h, grad_g = mera1d(h, g).energy_gradient(8)
+        assert np.isclose(E, mera1d(h, g).energy(8))
+
+        h_s, g_s, d = h.scaling_filter, g.scaling_filter, 1e-6
+        assert np.array_equal(grad_h.range, h_s.range)
+        assert np.array_equal(grad_g.range, g_s.range)
+        for j in range(len(h_s.data)):
+            e = signal(np.eye(len(h_s.data))[j] * d, h_s.start)
+            dE = (energy(h_s + e, g_s) - energy(h_s - e, g_s)) / (2 * d)
+            assert abs(dE - grad_h.data[j]) < 1e-7
+            e = signal(np.eye(len(g_s.data))[j] * d, g_s.start)
+            dE = (energy(h_s, g_s + e) - energy(h_s, g_s - e)) / (2 * d)
+            assert abs(dE - grad_g.data[j]) < 1e-7
+
+
+def test_bosonic():
+    import scipy.special
+
+    m = bosonic_mera.selesnick(3, 3)
+    assert abs(m.energy(20) - 1 / np.pi) < 1e-4
+
+    x = np.arange(10)
+    C_p = m.p_covariance(10, 20)
+    C_q = m.q_covariance(10, 20)
+    assert np.allclose(C_p[0], -1 / (4 * np.pi * (x**2 - 1 / 4)), atol=5e-3)
+    psi = scipy.special.digamma
+    exact = -(psi(1 / 2 + x) + psi(1 / 2 - x) - 2 * psi(1 / 2)) / (2 * np.pi)
+    assert np.allclose(C_q[0], exact, atol=2e-2)
+
+    # compare with analyzing unit signals one by one
+    def covariance(i, alpha, N, levels):
+        C = np.zeros((N, N))
+        for x in range(N):
+            for y in range(N):
+                a, b = signal([1.0], x), signal([1.0], y)
+                for _ in range(levels):
+                    a, c = m.w.analyze(i, a)
+                    b, d = m.w.analyze(i, b)
+                    a, b = alpha * a, alpha * b
+                    C[x, y] += c.vdot(d) / 2
+                C[x, y] += a.vdot(b) / 2
+        return C
+
+    assert np.allclose(m.p_covariance(5, 6), covariance(0, 1 / np.sqrt(2), 5, 6))
+    C = covariance(1, np.sqrt(2), 5, 6)
+    assert np.allclose(m.q_covariance(5, 6, regulate=False), C)
+    assert np.allclose(m.q_covariance(5, 6), C - np.diag(C)[:, np.newaxis])
+
+    # energy is the average over a period
+    P = 2**5
+    C_p, C_q = m.p_covariance(P + 1, 5), m.q_covariance(P + 1, 5, regulate=False)
+    n = np.arange(P)
+    E = C_p[n, n] / 2 + (C_q[n, n] + C_q[n + 1, n + 1] - 2 * C_q[n, n + 1]) / 8
+    assert np.isclose(np.mean(E), m.energy(5))
+
+
+def test_correlation_2d():
+    m = mera2d.selesnick(1, 2)
+    dx, dy = np.arange(-3, 6), np.arange(-4, 3)
+    C = m.correlation(dx, dy, 3, 2, x=3, y=-1)
+    assert C.shape == (9, 7)
+    assert np.all(np.isnan(C[(dx[:, np.newaxis] - dy) % 2 != 0]))
+
+    # sum over translates of the mode pairs of all level pairs
+    def value(n, m, a, b, X, Y):
+        s = a if X % 2 == 0 else b
+        i, j = X // 2 - n[0], Y // 2 - m[0]
+        return s[i, j] / np.sqrt(2) if 0 <= i < len(n) and 0 <= j < len(m) else 0
+
+    for i, j in [(3, 4), (5, 6), (0, 1), (8, 3)]:
+        X, Y = 3 + dx[i], -1 + dy[j]
+        expected = 0
+        for level_x, level_y in [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)]:
+            for t_x in range(-8, 8):
+                for t_y in range(-8, 8):
+                    pair = m.eigenmode_pair(level_x, level_y, t_x, t_y)
+                    expected += value(*pair, 3, -1) * value(*pair, X, Y)
+        assert np.isclose(C[i, j], expected)
+
+
+def test_periodic():
+    h, g = selesnick_hwlet(2, 3)
+    N = 64
+    m = periodic_mera1d(h, g, N)
+    for level in range(1, m.max_levels + 1):
+        assert np.allclose(
+            m.eigenmode(level), mera1d(h, g).eigenmode(level).periodize(N)
+        )
+
+    # the state is Gaussian at half filling, and its energy is close to the exact ground state energy of the chain
+    C = m.covariance()
+    assert np.allclose(C @ C, C)
+    assert np.isclose(np.trace(C), N / 2)
+    E_exact = np.sum(np.sort(-2 * np.cos(2 * np.pi * np.arange(N) / N))[: N // 2]) / N
+    assert np.isclose(m.energy(), -2 * np.mean(np.diag(np.roll(C, 1, axis=0))))
+    assert 0 < m.energy() - E_exact < 1e-3
+    assert np.allclose(m.two_point(np.arange(N)[:, np.newaxis], np.arange(N)), C)
+    assert np.allclose(
+        m.covariance(70, start=60),
+        C[np.ix_(np.arange(60, 70) % N, np.arange(60, 70) % N)],
+    )
+
+    # truncated levels agree with the infinite chain if the eigenmodes do not wrap around
+    assert np.isclose(periodic_mera1d(h, g, 1024).energy(4), mera1d(h, g).energy(4))
+
+
+def test_energy_spectral():
+    for K, L in [(1, 1), (2, 3)]:
+        m = mera1d.selesnick(K, L)
+        for levels in [1, 6]:
+            assert np.isclose(
+                m.energy(levels, method="spectral"), m.energy(levels), rtol=1e-14
+            )
+        m = mera2d.selesnick(K, L)
+        for levels in [(1, 1), (3, 5)]:
+            assert np.isclose(
+                m.energy(*levels, method="spectral"), m.energy(*levels), rtol=1e-14
+            )
+
+
+def test_mera3d():
+    m = mera3d.selesnick(1, 1)
+    E = m.energy(6, 6, 6)
+    assert abs(E + 32 / np.pi**3) < 0.1
+    assert np.isclose(m.energy(6, 6, 6, method="spectral"), E, rtol=1e-14)
+    E_adaptive, levels = m.energy_adaptive(1e-2)
+    assert levels == 6 and np.isclose(E_adaptive, E)
+    with pytest.warns(UserWarning):
+        m.energy_adaptive(1e-6, max_levels=6)
+
+    # compare with the dense mode pair, to which the Hamiltonian applies prod(1 - S^*) in each direction
+    pairs = m.eigenmode_pairs(1, 2, 1)
+    a = np.einsum("i,j,k->ijk", *[a.data for a, _ in pairs])
+    b = np.einsum("i,j,k->ijk", *[b.data for _, b in pairs])
+    for axis in range(3):
+        b = np.diff(b, axis=axis, prepend=0, append=0)
+    a = np.pad(a, [(0, 1)] * 3)
+    assert np.isclose(m.energy_of_mode_pair(pairs), -np.real(np.vdot(a, b)))
+
+    # energy from the correlation functions of the eight bonds of all sites of the even sublattice
+    d = np.array([-1, 0, 1])
+    E, levels = 0, (1, 3, 2)
+    for x, y, z in itertools.product(range(0, 16, 2), repeat=3):
+        C = m.correlation(d, d, d, *levels, x=x, y=y, z=z)
+        assert np.isnan(C[1, 0, 1]) and not np.isnan(C[2, 0, 2])
+        for delta in itertools.product([0, 2], repeat=3):
+            E += (-1) ** (delta.count(0) + 1) * np.real(C[delta]) / 8**3
+    assert np.isclose(E, m.energy(*levels))
+
+
+def test_tol():
+    m = mera1d.selesnick(2, 3)
+    a, b = m.eigenmode_pair(12)
+    a_tol, b_tol = m.eigenmode_pair(12, tol=1e-6)
+    assert a_tol.range.size == b_tol.range.size < a.range.size
+    assert np.allclose(a_tol.range, b_tol.range)
+    assert (a - a_tol).norm() <= 1e-6 and (b - b_tol).norm() <= 1e-6
+
+    for tol in [1e-3, 1e-6]:
+        assert abs(m.energy(10, tol=tol) - m.energy(10)) <= tol
+        dx, x = np.arange(-10, 20), np.arange(0, 40, 7)
+        C_tol = m.correlation(dx, 8, x, tol=tol)
+        assert np.max(np.abs(C_tol - m.correlation(dx, 8, x))) <= tol
@@ -0,0 +1,31 @@
+import numpy as np
+from .signal import *
+from .wavelets import *
+from .hilbert import *
+from .mera import *
+from .optimize import *
+
+
+def test_optimize_energy():
+    h, g = optimize_hwlet(4, levels=8, num_starts=4, seed=1, n_jobs=2)
+    for w in (h, g):
+        s = w.scaling_filter
+        assert np.isclose(np.sum(s.data), np.sqrt(2))
+        assert np.allclose(s.convolve(s.reverse()).data[1::2], [0, 1, 0])
+    assert mera1d(h, g).energy(10) < mera1d(*evenbly_white_hwlet()).energy(10)
+
+
+def test_optimize_offset():
+    for offset in [1, -2, 3]:
+        h, g = optimize_hwlet(4, levels=6, offset=offset, num_starts=2, seed=1)
+        assert g.scaling_filter.start == offset
+        E, grad_h, grad_g = mera1d(h, g).energy_gradient(6)
+        assert np.array_equal(grad_h.range, h.scaling_filter.range)
+        assert np.array_equal(grad_g.range, g.scaling_filter.range)
+
+
+def test_optimize_phase_error():
+    h, g = optimize_hwlet(8, objective="phase_error", num_starts=4, seed=1)
+    assert (
+        phase_error_gradient(h, g)[0] < phase_error_gradient(*selesnick_hwlet(2, 2))[0]
+    )
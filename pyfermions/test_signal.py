@@ -16,6 +16,17 @@ def test_sub():
     assert a.isclose(signal([1, -3 + 2j, -4], start=-1))
 
 
+def test_accumulate():
+    a = signal([1, 2], start=0)
+    data = a.data
+    a += signal([3], start=1)
+    assert a.data is data and a.isclose(signal([1, 5]))
+    a -= signal([1j, 1], start=-1)
+    assert a.isclose(signal([-1j, 0, 5], start=-1))
+    a.accumulate(signal([1, 1], start=1), alpha=2)
+    assert a.isclose(signal([-1j, 0, 7, 2], start=-1))
+
+
 def test_pow():
     a = signal([2, 2j], start=2) ** 2
     assert a.isclose(signal([4, -4], start=2))
@@ -70,3 +81,17 @@ def test_upsample():
     b = a.upsample()
     for n in b.range:
         assert b[n] == (a[n // 2] if n % 2 == 0 else 0)
+
+
+def test_trim():
+    a = signal([1e-9, 1, 2, 1e-9, 1e-8], start=5)
+    b, error = a.trim(1e-6)
+    assert b.start == 6 and np.array_equal(b.data, [1, 2])
+    assert np.isclose(error, (a - b).norm())
+
+    N = 100
+    a = signal(np.random.randn(N), np.random.randint(-N, N))
+    for tol in [0, 1, 3, 100]:
+        b, error = a.trim(tol)
+        assert len(b.data) >= 1 and a.start <= b.start and b.stop <= a.stop
+        assert np.isclose(error, (a - b).norm()) and error <= tol
@@ -0,0 +1,66 @@
+import pickle
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .signal import *
+from .wavelets import *
+from .hilbert import *
+from .mera import *
+from .storage import *
+
+
+def test_roundtrip(tmp_path):
+    h, g = selesnick_hwlet(1, 2)
+    m = mera1d(h, g)
+    m.two_point(0, 5, 2)
+    objects = [
+        signal([1.0, 2j], -3),
+        h,
+        massless_harmonic_biorth_wlet(1, 2),
+        m,
+        periodic_mera1d(h, g, 16),
+        mera2d(h, g),
+        mera3d(h, g),
+        bosonic_mera.selesnick(1, 2),
+    ]
+    for obj in objects:
+        save(tmp_path / "obj.npz", obj)
+        for copy in [load(tmp_path / "obj.npz"), from_bytes(to_bytes(obj))]:
+            assert type(copy) is type(obj)
+            assert to_bytes(copy) == to_bytes(obj)
+
+    copy = from_bytes(to_bytes(m))
+    assert copy._correlation_tables.keys() == m._correlation_tables.keys()
+    assert np.allclose(copy.covariance(10, 3), m.covariance(10, 3))
+
+    # subclasses are stored as their base class
+    class custom_mera1d(mera1d):
+        pass
+
+    copy = from_bytes(to_bytes(custom_mera1d(h, g)))
+    assert type(copy) is mera1d
+    with pytest.raises(TypeError):
+        to_bytes(object())
+
+
+def test_shared_memory():
+    m = mera1d.selesnick(1, 2)
+    with share(m, levels=3) as handle:
+        shared = attach(handle)
+        assert attach(handle) is shared
+        assert len(shared._correlation_tables) == 3
+        assert len(pickle.dumps(shared)) < 200
+        assert pickle.loads(pickle.dumps(shared)) is shared
+
+        with shared_array((40, 40)) as out, ProcessPoolExecutor(2) as executor:
+            C = shared.covariance(40, 3, out=out, tile_size=16, executor=executor)
+            assert np.allclose(C, m.covariance(40, 3))
+
+    class custom_mera2d(mera2d):
+        pass
+
+    with share(custom_mera2d(*selesnick_hwlet(1, 2)), levels=2) as handle:
+        assert len(attach(handle).mera1d._correlation_tables) == 2
+
+    with pytest.raises(TypeError):
+        share(bosonic_mera.selesnick(1, 2), levels=3)
@@ -1,3 +1,4 @@
+import pytest
 import numpy as np
 from .utils import *
 
@@ -12,3 +13,27 @@ def test_convmtx():
         [0.0, 0.0, 0.0, 0.0, -1.0],
     ]
     assert np.allclose(convmtx([1, -1], 5), expected)
+
+
+def test_parallel_map():
+    items = range(10)
+    for n_jobs in [None, 1, 3, -1]:
+        assert parallel_map(abs, items, n_jobs=n_jobs) == list(items)
+    for n_jobs in [0, -2, 1.5]:
+        with pytest.raises(AssertionError, match="n_jobs"):
+            parallel_map(abs, items, n_jobs=n_jobs)
+
+
+def test_memory_budget():
+    n, m, omega = np.arange(-5, 40), np.arange(3, 20), np.linspace(-3, 3, 101)
+    s, s2 = np.random.randn(45) + 1j * np.random.randn(45), np.random.randn(45, 17)
+    f, f2 = dtft(n, s, omega), dtft2d(n, m, s2, omega)
+    with memory_budget(10**6):
+        assert get_memory_budget() == 10**6
+        assert np.allclose(dtft(n, s, omega), f, rtol=1e-13, atol=0)
+        assert np.allclose(dtft2d(n, m, s2, omega), f2, rtol=1e-13, atol=0)
+    assert get_memory_budget() is None
+
+    with memory_budget(1000):
+        with pytest.raises(MemoryBudgetError):
+            dtft(n, s, omega)
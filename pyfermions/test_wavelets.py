@@ -21,11 +21,48 @@ def test_reconstruct_and_analyze():
     assert b.isclose(B)
 
 
+def test_reconstruct_out():
+    a = random_signal()
+    b = random_signal()
+    out = random_signal()
+    expected = out + DAUBECHIES_D4.reconstruct(a, b)
+    assert DAUBECHIES_D4.reconstruct(a, b, out=out) is out
+    assert out.isclose(expected)
+
+
 def test_scaling_from_reconstruct():
     scaling_filter = DAUBECHIES_D4.reconstruct(signal([1]), signal())
     assert scaling_filter.isclose(DAUBECHIES_D4.scaling_filter)
 
 
+def test_cascade_tol():
+    h = DAUBECHIES_D4
+    x, phi = h.scaling_function(12)
+    for tol in [1e-3, 1e-8]:
+        x_tol, phi_tol = h.scaling_function(12, tol=tol)
+        assert len(phi_tol) < len(phi)
+        i = round((x_tol[0] - x[0]) * 2**12)
+        error = signal(phi) - signal(phi_tol, i)
+        assert error.norm() * 2**-6 <= tol
+
+
+def test_periodic():
+    x = np.random.rand(16) + 1j * np.random.rand(16)
+    scaling, wavelet = DAUBECHIES_D4.analyze_periodic(x)
+    assert np.allclose(DAUBECHIES_D4.reconstruct_periodic(scaling, wavelet), x)
+
+    # circular transforms agree with the periodization of the ordinary ones
+    A, B = DAUBECHIES_D4.analyze(signal(np.tile(x, 3), -16))
+    assert np.allclose(scaling, [A[n] for n in range(8)])
+    assert np.allclose(wavelet, [B[n] for n in range(8)])
+    a = signal(np.random.rand(8), 5)
+    s = DAUBECHIES_D4.reconstruct(scaling=a)
+    assert np.allclose(
+        DAUBECHIES_D4.reconstruct_periodic(a.periodize(8), np.zeros(8)),
+        s.periodize(16),
+    )
+
+
 def test_from_scaling_filter():
     assert orthogonal_wavelet.from_scaling_filter(
         DAUBECHIES_D4.scaling_filter
@@ -36,3 +73,14 @@ def test_from_wavelet_filter():
     assert orthogonal_wavelet.from_wavelet_filter(
         DAUBECHIES_D4.wavelet_filter
     ).scaling_filter.isclose(DAUBECHIES_D4.scaling_filter)
+
+
+def test_biorthogonal():
+    h = DAUBECHIES_D4.scaling_filter
+    w = biorthogonal_wavelet.from_scaling_filters([h, h.shift(2)])
+    assert w.wavelet_filters[1].isclose(DAUBECHIES_D4.wavelet_filter)
+    v = biorthogonal_wavelet.from_wavelet_filters(w.wavelet_filters)
+    assert all(a.isclose(b) for a, b in zip(v.scaling_filters, w.scaling_filters))
+
+    s = signal(np.random.randn(10), start=-3)
+    assert w.reconstruct(1, *w.analyze(1, s)).isclose(s)
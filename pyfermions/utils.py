@@ -1,11 +1,31 @@
+import contextlib, os
 import numpy as np
-import scipy.fftpack
 
-__all__ = ["convmtx", "ctft", "dtft", "dtft2d"]
+__all__ = [
+    "MemoryBudgetError",
+    "compute_dtype",
+    "convmtx",
+    "ctft",
+    "dtft",
+    "dtft2d",
+    "get_compute_dtype",
+    "get_memory_budget",
+    "memory_budget",
+    "parallel_map",
+]
+
+_compute_dtype = np.dtype(np.float64)
+_memory_budget = None
+
+
+class MemoryBudgetError(MemoryError):
+    """Raised if a single allocation that cannot be split into chunks would exceed the memory budget."""
 
 
 def convmtx(h, N):
     """Return convolution matrix for kernel h and input signals of length N."""
+    import scipy.linalg
+
     return scipy.linalg.toeplitz(np.r_[h, [0] * (N - 1)], np.zeros(N))
 
 
@@ -32,6 +52,9 @@ def ctft(x, f, domega=0.01, omega_max=None):
     target_size = max(int(1 / (domega * dx) + 1), f.size)
     pad_left = (target_size - f.size) // 2
     pad_right = target_size - f.size - pad_left
+    _check_allocation(
+        64 * target_size, "ctft (zero-padded signal of length %d)" % target_size
+    )
     x = np.r_[
         x[0] + np.arange(-pad_left, 0) * dx, x, x[-1] + np.arange(1, pad_right + 1) * dx
     ]
@@ -52,23 +75,144 @@ def ctft(x, f, domega=0.01, omega_max=None):
 
 
 def dtft(n, s, omega):
-    """Periodic Fourier transform of a discrete signal s[n]."""
-    return np.sum(
-        s[:, np.newaxis] * np.exp(-1j * n[:, np.newaxis] * omega[np.newaxis, :]), axis=0
+    """
+    Periodic Fourier transform of a discrete signal s[n].
+
+    The frequencies are processed in chunks such that the temporary (n x omega) matrices fit into the memory budget.
+    """
+    dtype = np.result_type(s, np.complex128)
+    f = np.empty(len(omega), dtype=dtype)
+    step = _chunk_size(
+        len(omega), 48 * len(n), dtype.itemsize * (len(n) + len(omega)), "dtft"
     )
+    for i in range(0, len(omega), step):
+        chunk = omega[np.newaxis, i : i + step]
+        f[i : i + step] = np.sum(
+            s[:, np.newaxis] * np.exp(-1j * n[:, np.newaxis] * chunk), axis=0
+        )
+    return f
 
 
 def dtft2d(n, m, s, omega):
-    """Periodic 2D Fourier transform of a discrete signal s[n,m]."""
+    """
+    Periodic 2D Fourier transform of a discrete signal s[n,m].
+
+    As for dtft, the frequencies are processed in chunks such that the temporary 3D arrays fit into the memory budget.
+    """
+    dtype = np.result_type(s, np.complex128)
+    fixed = dtype.itemsize * len(omega) * (len(n) + len(omega))
+
     # sample discrete-time Fourier transform
-    f_half = np.sum(
-        s[:, :, np.newaxis]
-        * np.exp(-1j * m[np.newaxis, :, np.newaxis] * omega[np.newaxis, np.newaxis, :]),
-        axis=1,
-    )
-    f = np.sum(
-        f_half[:, np.newaxis, :]
-        * np.exp(-1j * n[:, np.newaxis, np.newaxis] * omega[np.newaxis, :, np.newaxis]),
-        axis=0,
-    )
+    f_half = np.empty((len(n), len(omega)), dtype=dtype)
+    step = _chunk_size(len(omega), 48 * len(n) * len(m), fixed, "dtft2d")
+    for i in range(0, len(omega), step):
+        chunk = omega[np.newaxis, np.newaxis, i : i + step]
+        f_half[:, i : i + step] = np.sum(
+            s[:, :, np.newaxis] * np.exp(-1j * m[np.newaxis, :, np.newaxis] * chunk),
+            axis=1,
+        )
+    f = np.empty((len(omega), len(omega)), dtype=dtype)
+    step = _chunk_size(len(omega), 48 * len(n) * len(omega), fixed, "dtft2d")
+    for i in range(0, len(omega), step):
+        chunk = omega[np.newaxis, i : i + step, np.newaxis]
+        f[i : i + step] = np.sum(
+            f_half[:, np.newaxis, :]
+            * np.exp(-1j * n[:, np.newaxis, np.newaxis] * chunk),
+            axis=0,
+        )
     return f
+
+
+def parallel_map(f, items, executor=None, n_jobs=None):
+    """
+    Return [f(item) for item in items], possibly evaluated in parallel.
+
+    This is how the executor and n_jobs arguments throughout the package are handled: if an executor (e.g. a
+    concurrent.futures.ThreadPoolExecutor or ProcessPoolExecutor) is given, it is used to evaluate f. Otherwise, if
+    n_jobs is not None, a thread pool with n_jobs workers is used (n_jobs=-1 means one worker per CPU). The results are
+    always returned in the order of the items, so reductions are deterministic.
+    """
+    assert (
+        n_jobs is None
+        or n_jobs == -1
+        or (isinstance(n_jobs, (int, np.integer)) and n_jobs >= 1)
+    ), "n_jobs should be None, -1 or a positive integer, not %r" % (n_jobs,)
+    items = list(items)
+    if executor is not None:
+        return list(executor.map(f, items))
+    if n_jobs is None or n_jobs == 1 or len(items) <= 1:
+        return [f(item) for item in items]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(f, items))
+
+
+def get_compute_dtype():
+    """Return the real floating-point dtype currently used for cascades, overlaps and covariance matrices."""
+    return _compute_dtype
+
+
+@contextlib.contextmanager
+def compute_dtype(dtype):
+    """
+    Context manager that sets the real floating-point dtype (e.g. np.float32) used for cascades, overlaps and covariance
+    matrices. Complex quantities use the corresponding complex dtype. Filter design is always done in double precision.
+
+    The setting is global (rather than per thread), so that it also applies to levels evaluated by parallel_map.
+    """
+    global _compute_dtype
+    dtype = np.dtype(dtype)
+    assert dtype.kind == "f", "dtype should be a real floating-point type"
+    previous, _compute_dtype = _compute_dtype, dtype
+    try:
+        yield
+    finally:
+        _compute_dtype = previous
+
+
+def get_memory_budget():
+    """Return the memory budget for large temporary arrays in bytes (None if there is no limit)."""
+    return _memory_budget
+
+
+@contextlib.contextmanager
+def memory_budget(nbytes):
+    """
+    Context manager that sets the memory budget (in bytes, or None for no limit) for large temporary arrays.
+
+    Kernels whose temporaries grow with their inputs (dtft, dtft2d, mera2d energies) split their work into chunks that
+    fit into the budget, which only changes their results by rounding errors. If a single allocation cannot be split
+    (e.g. the output itself, or the padded signal in ctft) and would exceed the budget, MemoryBudgetError is raised
+    instead. Like compute_dtype, the setting is global.
+    """
+    global _memory_budget
+    assert nbytes is None or nbytes > 0, "memory budget should be positive"
+    previous, _memory_budget = _memory_budget, nbytes
+    try:
+        yield
+    finally:
+        _memory_budget = previous
+
+
+def _check_allocation(nbytes, what):
+    """Raise MemoryBudgetError if an allocation of nbytes for the given purpose exceeds the memory budget."""
+    if _memory_budget is not None and nbytes > _memory_budget:
+        raise MemoryBudgetError(
+            "%s needs %d bytes, which exceeds the memory budget of %d bytes (see utils.memory_budget)"
+            % (what, nbytes, _memory_budget)
+        )
+
+
+def _chunk_size(num_items, item_bytes, fixed_bytes=0, what="temporary arrays"):
+    """
+    Return the number of items per chunk such that fixed_bytes plus the temporaries of the chunk (item_bytes per item)
+    fit into the memory budget. Raises MemoryBudgetError if not even a single item fits.
+    """
+    if _memory_budget is None:
+        return max(num_items, 1)
+    _check_allocation(fixed_bytes + item_bytes, what)
+    return max(min(num_items, (_memory_budget - fixed_bytes) // max(item_bytes, 1)), 1)
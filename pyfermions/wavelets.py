@@ -1,6 +1,8 @@
+import math
+import numpy as np
 from .signal import *
 
-__all__ = ["orthogonal_wavelet", "DAUBECHIES_D4"]
+__all__ = ["orthogonal_wavelet", "biorthogonal_wavelet", "DAUBECHIES_D4"]
 
 
 class orthogonal_wavelet:
@@ -26,47 +28,172 @@ class orthogonal_wavelet:
         scaling_filter = -wavelet_filter.reverse().shift(1).modulate(-1.0).conj()
         return orthogonal_wavelet(scaling_filter, wavelet_filter)
 
+    def astype(self, dtype):
+        """Return wavelet with filters converted to the given dtype."""
+        return orthogonal_wavelet(
+            self.scaling_filter.astype(dtype), self.wavelet_filter.astype(dtype)
+        )
+
     def analyze(self, s):
         """Decompose signal into scaling and wavelet coefficients."""
         scaling = s.convolve(self.scaling_filter.reverse()).downsample()
         wavelet = s.convolve(self.wavelet_filter.reverse()).downsample()
         return (scaling, wavelet)
 
-    def reconstruct(self, scaling=None, wavelet=None):
-        """Reconstruct signal from scaling and wavelet coefficients."""
+    def reconstruct(self, scaling=None, wavelet=None, out=None):
+        """
+        Reconstruct signal from scaling and wavelet coefficients.
+
+        If out is given, the reconstructed signal is added to it in place (see signal.accumulate) and out is returned.
+        """
         if scaling is None:
-            scaling = signal()
+            scaling = signal(np.zeros(0, dtype=self.scaling_filter.data.dtype))
         if wavelet is None:
-            wavelet = signal()
-        return scaling.upsample().convolve(
-            self.scaling_filter
-        ) + wavelet.upsample().convolve(self.wavelet_filter)
-
-    def scaling_function(self, L):
-        """Return scaling function at dyadic approximation 2^{-L}."""
-        s = self._cascade(L, scaling=signal([1]))
+            wavelet = signal(np.zeros(0, dtype=self.wavelet_filter.data.dtype))
+        a = scaling.upsample().convolve(self.scaling_filter)
+        b = wavelet.upsample().convolve(self.wavelet_filter)
+        if out is not None:
+            return out.accumulate(a).accumulate(b)
+
+        # add the smaller term into the buffer of the larger one if possible (this is the case in the cascade algorithm)
+        if a.data.size < b.data.size:
+            a, b = b, a
+        if (
+            a.start <= b.start
+            and b.stop <= a.stop
+            and np.result_type(a.data, b.data) == a.data.dtype
+        ):
+            return a.accumulate(b)
+        return a + b
+
+    def analyze_periodic(self, x):
+        """
+        Decompose periodic signal, given by the array x of its values on one period of even length, into the periodic
+        scaling and wavelet coefficients (arrays of half the length). The circular convolutions are computed by FFTs.
+        """
+        L = len(x)
+        assert L % 2 == 0, "period should be even"
+        X = np.fft.fft(x)
+        return tuple(
+            _circular(X * f.reverse().fft(L), x, f)[::2]
+            for f in (self.scaling_filter, self.wavelet_filter)
+        )
+
+    def reconstruct_periodic(self, scaling, wavelet):
+        """Reconstruct periodic signal from periodic scaling and wavelet coefficients (see analyze_periodic)."""
+        L = 2 * len(scaling)
+        X = np.tile(np.fft.fft(scaling), 2) * self.scaling_filter.fft(L)
+        X += np.tile(np.fft.fft(wavelet), 2) * self.wavelet_filter.fft(L)
+        return _circular(X, scaling, wavelet, self.scaling_filter, self.wavelet_filter)
+
+    def scaling_function(self, L, tol=None):
+        """
+        Return scaling function at dyadic approximation 2^{-L}. If tol is given, the negligible tails are trimmed such
+        that the L^2 error of the function is at most tol (see _cascade).
+        """
+        s = self._cascade(L, scaling=signal([1]), tol=tol)
         return s.range * 2**-L, s.data * 2 ** (L / 2)
 
-    def wavelet_function(self, L):
-        """Return wavelet function at dyadic approximation 2^{-L}."""
-        s = self._cascade(L, wavelet=signal([1]))
+    def wavelet_function(self, L, tol=None):
+        """Return wavelet function at dyadic approximation 2^{-L} (see scaling_function for tol)."""
+        s = self._cascade(L, wavelet=signal([1]), tol=tol)
         return s.range * 2**-L, s.data * 2 ** (L / 2)
 
-    def _cascade(self, L, wavelet=None, scaling=None):
+    def _synthesis_gain(self):
+        """
+        Return bound on the operator norm of s -> reconstruct(scaling=s) on l^2, which is 1 for orthogonal wavelets.
+
+        With the autocorrelation r of the scaling filter, |H(k)|^2 + |H(k + pi)|^2 = 2 sum_m r[2m] e^{-2imk}, so the
+        squared norm max_k (|H(k)|^2 + |H(k + pi)|^2) / 2 is at most sum_m |r[2m]|.
+        """
+        h = self.scaling_filter
+        r = signal(np.correlate(h.data, h.data, mode="full"), 1 - len(h.data))
+        return math.sqrt(np.sum(np.abs(r.downsample().data)))
+
+    def _cascade(self, L, wavelet=None, scaling=None, tol=None):
         """
         Starting from scaling and wavelet coefficients at level L, return output of inverse wavelet transform.
         This is known as the cascade algorithm.
+
+        If tol is given, leading and trailing coefficients are trimmed after every level (see signal.trim). An error
+        introduced with l levels to go is amplified by at most _synthesis_gain()^l, and the budget of each level is
+        chosen such that the l^2 error of the output is at most tol.
         """
         # there is some numerical instability in scipy's implementation of the cascade algorithm (as compared to our code
         # below and to Matlab's wavefun); otherwise we could simply use scipy.signal.cascade(self.scaling_filter.data, L)
+        gain = self._synthesis_gain() if tol is not None else 1
         s = self.reconstruct(scaling=scaling, wavelet=wavelet)
-        for l in range(L - 1):
-            s = self.reconstruct(scaling=s)
+        for l in range(L):
+            if tol is not None:
+                s, _ = s.trim(tol / (L * gain ** (L - 1 - l)))
+            if l < L - 1:
+                s = self.reconstruct(scaling=s)
         return s
 
 
+class biorthogonal_wavelet:
+    """
+    Biorthogonal wavelet consisting of a pair of scaling (low-pass) filters and a pair of wavelet (high-pass) filters.
+
+    The filters with index i = 0, 1 form the i-th channel, which is used to decompose and reconstruct signals like an
+    orthogonal_wavelet. The wavelet filter of each channel is obtained from the scaling filter of the other channel.
+    """
+
+    def __init__(self, scaling_filters, wavelet_filters):
+        #: Scaling filters (low-pass filters).
+        self.scaling_filters = list(scaling_filters)
+
+        #: Wavelet filters (high-pass filters).
+        self.wavelet_filters = list(wavelet_filters)
+
+    @staticmethod
+    def from_scaling_filters(scaling_filters):
+        """Construct biorthogonal wavelet from scaling filters."""
+        wavelet_filters = [
+            -s.conj().modulate(-1.0).shift(-1).reverse() for s in scaling_filters[::-1]
+        ]
+        return biorthogonal_wavelet(scaling_filters, wavelet_filters)
+
+    @staticmethod
+    def from_wavelet_filters(wavelet_filters):
+        """Construct biorthogonal wavelet from wavelet filters."""
+        scaling_filters = [
+            -w.reverse().shift(1).modulate(-1.0).conj() for w in wavelet_filters[::-1]
+        ]
+        return biorthogonal_wavelet(scaling_filters, wavelet_filters)
+
+    def channel(self, i):
+        """Return the filters of the i-th channel as an orthogonal_wavelet (which need not be orthogonal)."""
+        assert i in [0, 1]
+        return orthogonal_wavelet(self.scaling_filters[i], self.wavelet_filters[i])
+
+    def analyze(self, i, s):
+        """Decompose signal into scaling and wavelet coefficients using the i-th channel."""
+        return self.channel(i).analyze(s)
+
+    def reconstruct(self, i, scaling=None, wavelet=None):
+        """Reconstruct signal from scaling and wavelet coefficients using the i-th channel."""
+        return self.channel(i).reconstruct(scaling=scaling, wavelet=wavelet)
+
+    def scaling_functions(self, L):
+        """Return scaling functions (x_0, phi_0, x_1, phi_1) of both channels at dyadic approximation 2^{-L}."""
+        return self.channel(0).scaling_function(L) + self.channel(1).scaling_function(L)
+
+    def wavelet_functions(self, L):
+        """Return wavelet functions (x_0, psi_0, x_1, psi_1) of both channels at dyadic approximation 2^{-L}."""
+        return self.channel(0).wavelet_function(L) + self.channel(1).wavelet_function(L)
+
+
 DAUBECHIES_D4_SCALING_FILTER = signal(
     [0.482_962_913_145, 0.836_516_303_738, 0.224_143_868_042, -0.129_409_522_551]
 )
 
 DAUBECHIES_D4 = orthogonal_wavelet.from_scaling_filter(DAUBECHIES_D4_SCALING_FILTER)
+
+
+def _circular(X, *inputs):
+    """Return inverse FFT of X, which is taken to be real if all inputs (arrays or signals) are real."""
+    x = np.fft.ifft(X)
+    if all(np.isrealobj(getattr(a, "data", a)) for a in inputs):
+        return x.real
+    return x
@@ -34,6 +34,7 @@ setup(
     packages=["pyfermions"],
     install_requires=["matplotlib", "numpy", "scipy", "pandas", "jupyter"],
     extras_require={
-        "dev": ["pytest", "wheel", "black", "twine", "jupyter_contrib_nbextensions"]
+        "dev": ["pytest", "wheel", "black", "twine", "jupyter_contrib_nbextensions"],
+        "mp": ["mpmath>=1.4"],
     },
 )